@@ -0,0 +1,384 @@
+import numpy as np
+import pandas as pd
+from math import exp, inf
+from time import time
+from Deadline import Deadline
+
+class Annealer():
+    """
+    Class that runs simulated annealing on integer lists instead of on the cottages and DataFrames of the Planner.
+    Cottages and reservations are numbered by row. A move puts one reservation in another cottage it is allowed in,
+    and its score change is read from a table with the score of every possible gap.
+    The best planning is kept as a log of the moves since it was found, which are undone at the end.
+    """
+    def __init__(self, planner, undo_limit = 1000000):
+        cottage = next(iter(planner.cottages.values()))
+        self.daycount = cottage.daycount
+        self.startday = cottage.startday
+        self.scores = cottage.scores
+        self.undo_limit = undo_limit
+        self.cottage_IDs = list(planner.cottages)
+        cottage_rows = {cottage_ID: row for row, cottage_ID in enumerate(self.cottage_IDs)}
+        index = planner.candidate_index
+        self.reservation_IDs = list()
+        self.start_days = list()
+        self.end_days = list()
+         # per reservation the rows of the cottages it is allowed in and whether that is an upgrade
+        self.candidates = list()
+        self.candidate_upgrades = list()
+        self.initial_rows = list()
+        self.initial_upgrades = list()
+        for ID_res, (cottage_ID, start_day, end_day, upgrade) in planner.assignment_index.items():
+            positions = index.reservation(ID_res)
+            self.reservation_IDs.append(ID_res)
+            self.start_days.append(start_day)
+            self.end_days.append(end_day)
+            self.candidates.append([cottage_rows[ID] for ID in index.ID_cot[positions].tolist()])
+            self.candidate_upgrades.append(index.upgrade[positions].tolist())
+            self.initial_rows.append(cottage_rows[cottage_ID])
+            self.initial_upgrades.append(bool(upgrade))
+        self.movable = [i for i, options in enumerate(self.candidates) if len(options) > 1]
+        self.initial_score = planner.score
+        self.gap_values = self.gap_table()
+        self.rng = np.random.default_rng()
+        self.reset()
+
+
+    def gap_table(self):
+        """
+        Function that calculates the score of every gap. The score only depends on the day of the week the gap starts on
+        and on its length, so there are 7 rows instead of one for every day.
+
+        Returns
+        -------
+        gap_values : list
+            list of lists where gap_values[a % 7][length] is the score of a gap of length days that starts on day a,
+            or 0 if the length is 0.
+
+        """
+        weekdays = np.arange(7)[:, None]
+        lengths = np.arange(self.daycount + 1)[None, :]
+         # days from the start of the gap to its first friday
+        first_fridays = (4 - self.startday - weekdays) % 7
+        weeks = np.where(first_fridays + 6 <= lengths - 1, (lengths - 7 - first_fridays) // 7 + 1, 0)
+        values = self.scores["Gap"] + weeks * self.scores["GapFriToThu"] + (lengths >= 22) * self.scores["GapLegionella"]
+        return np.where(lengths > 0, values, 0).tolist()
+
+
+    def reset(self):
+        """
+        Function that puts the annealer back to the planning it was created with.
+        """
+        self.rows = list(self.initial_rows)
+        self.upgrades = list(self.initial_upgrades)
+        self.fill_days()
+        self.score = self.initial_score
+        self.best_score = self.score
+        self.undo = list()
+        self.snapshot = None
+
+
+    def fill_days(self):
+        """
+        Function that fills the days of every cottage with the reservation rows, -1 is an empty day.
+        """
+        self.days = [[-1] * self.daycount for cottage_ID in self.cottage_IDs]
+        for i, row in enumerate(self.rows):
+            self.days[row][self.start_days[i]:self.end_days[i] + 1] = [i] * (self.end_days[i] - self.start_days[i] + 1)
+
+
+    def move(self, i, new_row, upgrade):
+        """
+        Function that moves reservation i to the cottage in new_row without any checks.
+        """
+        length = self.end_days[i] - self.start_days[i] + 1
+        self.days[self.rows[i]][self.start_days[i]:self.end_days[i] + 1] = [-1] * length
+        self.days[new_row][self.start_days[i]:self.end_days[i] + 1] = [i] * length
+        self.rows[i] = new_row
+        self.upgrades[i] = upgrade
+
+
+    def rewind(self):
+        """
+        Function that undoes the moves in the undo log.
+
+        Returns
+        -------
+        redo : list
+            The undone moves in the order they have to be redone.
+
+        """
+        redo = list()
+        while self.undo:
+            i, row, upgrade = self.undo.pop()
+            redo.append((i, self.rows[i], self.upgrades[i]))
+            self.move(i, row, upgrade)
+        redo.reverse()
+        return redo
+
+
+    def compact(self):
+        """
+        Function that stores the best planning as a copy when the undo log becomes too long.
+        """
+        redo = self.rewind()
+        self.snapshot = (list(self.rows), list(self.upgrades))
+        for i, row, upgrade in redo: self.move(i, row, upgrade)
+
+
+    def restore_best(self):
+        """
+        Function that goes back to the best planning found since the last reset.
+        """
+        if self.snapshot != None:
+            self.rows, self.upgrades = list(self.snapshot[0]), list(self.snapshot[1])
+            self.fill_days()
+            self.undo = list()
+            self.snapshot = None
+        else: self.rewind()
+        self.score = self.best_score
+
+
+    def walk(self, temperature, max_moves, max_accepted, deadline):
+        """
+        Function that tries random moves at a fixed temperature.
+
+        Parameters
+        ----------
+        temperature : FLOAT
+            Temperature of the Metropolis criterion.
+        max_moves : INT
+            Maximum amount of moves that are tried.
+        max_accepted : INT
+            Stops after this amount of accepted moves.
+        deadline : FLOAT
+            Stops after this time.
+
+        Returns
+        -------
+        (moves : INT, accepted : INT)
+            Amount of tried and accepted moves.
+
+        """
+        days = self.days
+        rows = self.rows
+        upgrades = self.upgrades
+        start_days = self.start_days
+        end_days = self.end_days
+        candidates = self.candidates
+        candidate_upgrades = self.candidate_upgrades
+        movable = self.movable
+        gap_values = self.gap_values
+        undo = self.undo
+        upgrade_score = self.scores["Upgrade"]
+        last_day = self.daycount - 1
+        movable_count = len(movable)
+        batch = 1024
+        moves = accepted = 0
+        if movable_count == 0: return moves, accepted
+        while moves < max_moves and accepted < max_accepted:
+            if moves % batch == 0:
+                if time() > deadline: break
+                draws = self.rng.random((batch, 3)).tolist()
+            draw_reservation, draw_cottage, draw_accept = draws[moves % batch]
+            moves += 1
+            i = movable[int(draw_reservation * movable_count)]
+            options = candidates[i]
+            k = int(draw_cottage * len(options))
+            new_row = options[k]
+            old_row = rows[i]
+            if new_row == old_row: continue
+            start_day = start_days[i]
+            end_day = end_days[i]
+            new_days = days[new_row]
+            if max(new_days[start_day:end_day + 1]) >= 0: continue
+             # score change of filling the gap in the new cottage
+            gap_start = start_day
+            while gap_start > 0 and new_days[gap_start - 1] < 0: gap_start -= 1
+            gap_end = end_day
+            while gap_end < last_day and new_days[gap_end + 1] < 0: gap_end += 1
+            delta = gap_values[gap_start % 7][start_day - gap_start] + gap_values[(end_day + 1) % 7][gap_end - end_day] - \
+                    gap_values[gap_start % 7][gap_end - gap_start + 1]
+             # score change of emptying the days in the old cottage
+            old_days = days[old_row]
+            gap_start = start_day
+            while gap_start > 0 and old_days[gap_start - 1] < 0: gap_start -= 1
+            gap_end = end_day
+            while gap_end < last_day and old_days[gap_end + 1] < 0: gap_end += 1
+            delta += gap_values[gap_start % 7][gap_end - gap_start + 1] - gap_values[gap_start % 7][start_day - gap_start] - \
+                     gap_values[(end_day + 1) % 7][gap_end - end_day]
+            new_upgrade = candidate_upgrades[i][k]
+            delta += (new_upgrade - upgrades[i]) * upgrade_score
+            if delta > 0 and (temperature <= 0 or draw_accept >= exp(-delta / temperature)): continue
+            length = end_day - start_day + 1
+            old_days[start_day:end_day + 1] = [-1] * length
+            new_days[start_day:end_day + 1] = [i] * length
+            if self.snapshot == None: undo.append((i, old_row, upgrades[i]))
+            rows[i] = new_row
+            upgrades[i] = new_upgrade
+            self.score += delta
+            accepted += 1
+            if self.score < self.best_score:
+                self.best_score = self.score
+                undo.clear()
+                self.snapshot = None
+            elif len(undo) > self.undo_limit:
+                self.compact()
+                undo.clear()
+        return moves, accepted
+
+
+    def run(self, max_time = 300, temperature_init_mul = 0.0001, temperature_mul = 0.5, temperature_repeat = 100, seed = None, max_moves = None):
+        """
+        Function that uses simulated annealing with the same temperature schedule as Planner.assign_improvements_simulated
+        and ends in the best planning it found.
+
+        Parameters
+        ----------
+        max_time : INT, optional
+            Sets the maximum amount of seconds the function is allowed to run. The default is 300.
+        temperature_init_mul : FLOAT, optional
+            multiplier of the first score to create initial temperature. The default is 0.0001.
+        temperature_mul : FLOAT, optional
+            multiplier of the temperature after each repeat. The default is 0.5.
+        temperature_repeat : INT, optional
+            amount of accepted moves before the temperature is reduced. The default is 100.
+        seed : INT, optional
+            Seed of the random generator. The default is None.
+        max_moves : INT, optional
+            Maximum amount of moves that are tried. The default is None.
+
+        Returns
+        -------
+        stats : dict
+            dictionary with the score, the amount of tried and accepted moves, the seconds and the moves per second.
+
+        """
+        for best_score in self.steps(Deadline(max_time), temperature_init_mul, temperature_mul, temperature_repeat, seed, max_moves): pass
+        return self.stats
+
+    def steps(self, deadline, temperature_init_mul = 0.0001, temperature_mul = 0.5, temperature_repeat = 100, seed = None, max_moves = None):
+        """
+        Function that runs the annealing of run and yields the best score after every temperature that improved it.
+        The annealer ends in the best planning, also when the generator is closed early, and the numbers of run are kept in self.stats.
+        The temperature it ended with is kept in self.temperature.
+        """
+        self.rng = np.random.default_rng(seed)
+        if max_moves == None: max_moves = inf
+        temperature = self.score * temperature_init_mul
+        runtime = time()
+        self.stats = {"score": self.score, "moves": 0, "accepted": 0, "seconds": 0, "moves_per_second": 0}
+        best_score = self.best_score
+        try:
+            while self.stats["moves"] < max_moves and not deadline.expired():
+                tried, accepts = self.walk(temperature, max_moves - self.stats["moves"], temperature_repeat, time() + deadline.remaining())
+                self.stats["moves"] += tried
+                self.stats["accepted"] += accepts
+                if self.best_score < best_score:
+                    best_score = self.best_score
+                    yield best_score
+                if accepts < temperature_repeat: break
+                temperature *= temperature_mul
+        finally:
+            self.restore_best()
+            self.temperature = temperature
+            seconds = time() - runtime
+            self.stats.update({"score": self.score, "seconds": seconds, \
+                               "moves_per_second": self.stats["moves"] / seconds if seconds > 0 else 0})
+
+
+    def load(self, rows, upgrades, score):
+        """
+        Function that puts a planning from another annealer with the same reservations in this annealer.
+        """
+        self.rows = list(rows)
+        self.upgrades = list(upgrades)
+        self.fill_days()
+        self.score = score
+        self.best_score = score
+        self.undo = list()
+        self.snapshot = None
+
+
+    def assignment(self):
+        """
+        Function that returns the planning of the annealer.
+
+        Returns
+        -------
+        assignments : pd.Series
+            Series with reservation_ID as index and cottage number as value.
+
+        """
+        return pd.Series([self.cottage_IDs[row] for row in self.rows], index = self.reservation_IDs, dtype = "int64").sort_index()
+
+
+    def apply(self, planner):
+        """
+        Function that moves the reservations of the planner to the cottages of the annealer.
+        """
+        changed = [i for i, row in enumerate(self.rows) if planner.assigned_cottage(self.reservation_IDs[i]) != self.cottage_IDs[row]]
+        for i in changed: planner.remove_assignment(self.reservation_IDs[i])
+        for i in changed:
+            cottage_ID = self.cottage_IDs[self.rows[i]]
+            planner.add_assignment(cottage_ID, *planner.reservation_option(self.reservation_IDs[i], cottage_ID))
+        if planner.score != self.score: print("!!! score of the annealer is {} but the planner has {}".format(self.score, planner.score))
+
+    def apply_best(self, planner):
+        """
+        Function that moves the reservations of the planner to the cottages of the best planning,
+        while the annealer keeps its current planning and goes on from there.
+        """
+        if self.snapshot == None: self.compact()
+        rows, upgrades, score = self.rows, self.upgrades, self.score
+        self.rows, self.upgrades, self.score = self.snapshot[0], self.snapshot[1], self.best_score
+        self.apply(planner)
+        self.rows, self.upgrades, self.score = rows, upgrades, score
+
+
+ # annealer of a worker process, set once by init_worker so it is only sent to each process once
+worker_annealer = None
+
+def init_worker(annealer):
+    """
+    Function that stores the annealer in a worker process.
+    """
+    global worker_annealer
+    worker_annealer = annealer
+
+def run_worker(settings):
+    """
+    Function that starts a run of the annealer of the worker from the original planning.
+
+    Parameters
+    ----------
+    settings : dict
+        keyword arguments of Annealer.run.
+
+    Returns
+    -------
+    (stats : dict, rows : list, upgrades : list)
+        The stats of the run and the best planning it found.
+
+    """
+    worker_annealer.reset()
+    stats = worker_annealer.run(**settings)
+    return stats, worker_annealer.rows, worker_annealer.upgrades
+
+def replica_worker(connection, annealer, seed):
+    """
+    Function that runs one replica of parallel tempering in its own process. It waits for messages on the connection:
+    ("walk", temperature, moves, deadline) walks from the current planning and answers (score, best_score, moves, accepted),
+    ("best",) answers (rows, upgrades, score) of the best planning of the replica and ("stop",) ends the process.
+    """
+    annealer.rng = np.random.default_rng(seed)
+    while True:
+        message = connection.recv()
+        if message[0] == "walk":
+            moves, accepted = annealer.walk(message[1], message[2], inf, message[3])
+            connection.send((annealer.score, annealer.best_score, moves, accepted))
+        elif message[0] == "best":
+            annealer.restore_best()
+            connection.send((annealer.rows, annealer.upgrades, annealer.score))
+        else: break
+    connection.close()
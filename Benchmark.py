@@ -0,0 +1,173 @@
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import tracemalloc
+import numpy as np
+from copy import deepcopy
+from time import perf_counter
+from Generator import generate
+from Planner import Planner
+from Telemetry import Telemetry
+
+ # optimisers with the arguments they are benchmarked with, the planner starts from the Validator planning except for assign_cottages
+optimisers = {"assign_cottages": {},
+              "gaps_optimiser": {"max_time": 60},
+              "legionella_optimiser": {"max_time": 60},
+              "upgrade_optimiser": {"max_time": 60},
+              "fritothugaps_optimiser": {"max_time": 60},
+              "assign_improvements_simulated": {"max_time": 10},
+              "assign_improvements_annealing": {"max_time": 10, "seed": 0},
+              "lns_optimiser": {"max_time": 10, "seed": 0},
+              "ejection_chain_optimiser": {"max_time": 60}}
+
+ # (seed, cottages, season_days) of the generated parks
+datasets = [(0, 40, 120), (1, 80, 180)]
+
+def planner_state(planner):
+    """
+    Function that returns the score components of a planner, the same numbers Planner.results prints.
+    """
+    return {"score": int(planner.score), "gaps": int(planner.gaps), "legionellas": int(planner.legionellas), \
+            "fritothus": int(planner.fritothus), "upgrades": int(planner.upgrades)}
+
+def run_optimiser(base, optimiser, arguments, seed, memory):
+    """
+    Function that runs one optimiser on a copy of a planner.
+
+    Parameters
+    ----------
+    base : Planner
+        Planner to start from, is not changed.
+    optimiser : STR
+        Name of the Planner method.
+    arguments : dict
+        Keyword arguments of the method.
+    seed : INT
+        Seed of the random generators of random and numpy, which the older optimisers use.
+    memory : BOOL
+        If True the peak memory is measured with tracemalloc, which makes the run slower.
+
+    Returns
+    -------
+    result : dict
+        dictionary with the seconds or the peak memory in bytes, the amount of tried moves, the amount of moved reservations
+        and the score components.
+
+    """
+    planner = deepcopy(base)
+    planner.telemetry = Telemetry()
+    before = planner.reservation_assignments()
+    random.seed(seed)
+    np.random.seed(seed)
+    if memory: tracemalloc.start()
+    start = perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()): getattr(planner, optimiser)(**arguments)
+    result = {"seconds": perf_counter() - start}
+    if memory:
+        result = {"peak_memory": tracemalloc.get_traced_memory()[1]}
+        tracemalloc.stop()
+    after = planner.reservation_assignments()
+     # tried moves are the evaluated candidates of the telemetry, or the candidates for optimisers that don't evaluate one by one
+    counters = planner.telemetry.summary().get(optimiser, {"counters": dict()})["counters"]
+    result["moved"] = int((after != before.reindex(after.index)).sum())
+    result["moves"] = int(counters.get("evaluated", counters.get("candidates", result["moved"])))
+    result.update(planner_state(planner))
+    return result
+
+def benchmark(datasets = datasets, optimisers = optimisers, scale = 1, memory = True):
+    """
+    Function that runs every optimiser on every generated park.
+
+    Parameters
+    ----------
+    datasets : list, optional
+        list with the (seed, cottages, season_days) of the parks. The default is datasets.
+    optimisers : dict, optional
+        dictionary with the names of the optimisers and their arguments. The default is optimisers.
+    scale : FLOAT, optional
+        multiplier of the amount of cottages. The default is 1.
+    memory : BOOL, optional
+        If True every optimiser is run a second time to measure the peak memory. The default is True.
+
+    Returns
+    -------
+    report : list
+        list with a dictionary of the measurements of every park and optimiser.
+
+    """
+    report = list()
+    for seed, cottages, season_days in datasets:
+        cottages = int(cottages * scale)
+        name = "seed {} cottages {} days {}".format(seed, cottages, season_days)
+        df_cottages, df_reservations, df_validator = generate(seed, cottages, season_days)
+        start = perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()): planner = Planner(df_cottages, df_reservations)
+        report.append({"dataset": name, "optimiser": "__init__", "seconds": perf_counter() - start, "moves": 0, "moved": 0, **planner_state(planner)})
+        empty = deepcopy(planner)
+        with contextlib.redirect_stdout(io.StringIO()): planner.read_assignements(df_validator.set_index("ID")["Cottage"])
+        for optimiser, arguments in optimisers.items():
+            base = empty if optimiser == "assign_cottages" else planner
+            result = run_optimiser(base, optimiser, arguments, seed, False)
+            if memory: result["peak_memory"] = run_optimiser(base, optimiser, arguments, seed, True)["peak_memory"]
+            result["moves_per_second"] = result["moves"] / result["seconds"] if result["seconds"] > 0 else 0
+            report.append({"dataset": name, "optimiser": optimiser, **result})
+            print("{} {}: {:.2f} seconds, {} moves tried, {} reservations moved, score {}".format(name, optimiser, result["seconds"], \
+                  result["moves"], result["moved"], result["score"]))
+    return report
+
+def compare(report, baseline, threshold = 0.25, min_seconds = 0.5):
+    """
+    Function that compares a report with a baseline report.
+
+    Parameters
+    ----------
+    report : list
+        Report of benchmark.
+    baseline : list
+        Earlier report of benchmark.
+    threshold : FLOAT, optional
+        Allowed relative increase of the seconds and of the score, and decrease of the moves per second. 
+        The moves per second are what changes for optimisers that always run until their max_time. The default is 0.25.
+    min_seconds : FLOAT, optional
+        Runs that took less seconds in the baseline are not compared on time and moves per second. The default is 0.5.
+
+    Returns
+    -------
+    regressions : list
+        list with a message for every regression.
+
+    """
+    base = {(result["dataset"], result["optimiser"]): result for result in baseline}
+    regressions = list()
+    for result in report:
+        old = base.get((result["dataset"], result["optimiser"]))
+        if old == None: continue
+        if old["seconds"] >= min_seconds and result["seconds"] > old["seconds"] * (1 + threshold):
+            regressions.append("{} {} took {:.2f} seconds instead of {:.2f}".format(result["dataset"], result["optimiser"], result["seconds"], old["seconds"]))
+        if old["seconds"] >= min_seconds and "moves_per_second" in old and result["moves_per_second"] * (1 + threshold) < old["moves_per_second"]:
+            regressions.append("{} {} tried {:.0f} moves per second instead of {:.0f}".format(result["dataset"], result["optimiser"], \
+                               result["moves_per_second"], old["moves_per_second"]))
+        if result["score"] > old["score"] + threshold * abs(old["score"]):
+            regressions.append("{} {} has a score of {} instead of {}".format(result["dataset"], result["optimiser"], result["score"], old["score"]))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Benchmarks the optimisers of the Planner on generated parks.")
+    parser.add_argument("report", help = "json file to write the report to")
+    parser.add_argument("--baseline", help = "json report to compare with")
+    parser.add_argument("--threshold", type = float, default = 0.25)
+    parser.add_argument("--scale", type = float, default = 1)
+    parser.add_argument("--only", nargs = "+", choices = list(optimisers), help = "optimisers to run")
+    parser.add_argument("--no-memory", action = "store_true", help = "skip measuring the peak memory")
+    arguments = parser.parse_args()
+    selected = {optimiser: optimisers[optimiser] for optimiser in arguments.only} if arguments.only else optimisers
+    report = benchmark(datasets, selected, arguments.scale, not arguments.no_memory)
+    with open(arguments.report, "w") as file: json.dump(report, file, indent = 1)
+    if arguments.baseline:
+        with open(arguments.baseline) as file: regressions = compare(report, json.load(file), arguments.threshold)
+        for regression in regressions: print("!!! " + regression)
+        if regressions: sys.exit(1)
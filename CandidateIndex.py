@@ -0,0 +1,125 @@
+import numpy as np
+
+class CandidateIndex():
+    """
+    Class that indexes the rows of the combinations by cottage, arrival day, final day and reservation,
+    so the candidates for a gap are found with a dictionary lookup instead of filtering the whole table.
+    The day indexes are kept per class of cottages and map a key to the reservations of that class,
+    which are turned into the sorted row positions of one cottage with the dense array that holds
+    the position of every (reservation, cottage) pair.
+    """
+    def __init__(self, combinations, class_combinations, cottage_profiles):
+        self.ID_res = combinations["ID_res"].to_numpy()
+        self.ID_cot = combinations["ID_cot"].to_numpy()
+        self.upgrade = combinations["upgrade"].to_numpy(dtype = bool)
+        self.fitness = combinations["fitness"].to_numpy()
+        self.day = combinations["day"].to_numpy()
+        self.length = combinations["Length of Stay"].to_numpy()
+        self.pairs = np.full((self.ID_res.max() + 1, self.ID_cot.max() + 1), -1, dtype = np.int32)
+        self.pairs[self.ID_res, self.ID_cot] = np.arange(len(self.ID_res))
+        self.empty = np.zeros(0, dtype = np.int32)
+        self.by_reservation = self.group(combinations, "ID_res")
+        self.profiles = cottage_profiles.to_dict()
+        self.class_ID_res = class_combinations["ID_res"].to_numpy()
+        self.class_profile = class_combinations["profile"].to_numpy()
+        self.class_upgrade = class_combinations["upgrade"].to_numpy(dtype = bool)
+        self.class_fitness = class_combinations["fitness"].to_numpy()
+        self.class_day = class_combinations["day"].to_numpy()
+        self.class_length = class_combinations["Length of Stay"].to_numpy()
+        self.class_fixed = class_combinations["Cottage (Fixed)"].to_numpy()
+        self.by_class_day_final = self.group(class_combinations, ["profile", "day", "final_day"])
+        self.by_class_day = self.group(class_combinations, ["profile", "day"])
+        self.by_class_final = self.group(class_combinations, ["profile", "final_day"])
+        self.by_class = self.group(class_combinations, "profile")
+        self.by_reservation_class = self.group(class_combinations, "ID_res")
+
+
+    def group(self, combinations, columns):
+        """
+        Function that creates an index of the combinations.
+
+        Parameters
+        ----------
+        combinations : pd.DataFrame
+            Planner.combinations.
+        columns : STR or list
+            Column(s) that form the key of the index.
+
+        Returns
+        -------
+        index : dict
+            dictionary with the key as key and the row positions as value.
+
+        """
+        index = dict()
+        for key, positions in combinations.groupby(columns, sort = False).indices.items():
+            index[key] = positions.astype(np.int32)
+        return index
+
+
+    def in_cottage(self, class_positions, cottage_ID):
+        """
+        Function that turns rows of the class combinations into the rows of the combinations of one cottage of that class.
+
+        Parameters
+        ----------
+        class_positions : np.array
+            Row positions in the class combinations.
+        cottage_ID : INT
+            ID of the cottage.
+
+        Returns
+        -------
+        positions : np.array
+            Sorted row positions in the combinations, without the reservations that are fixed to another cottage.
+
+        """
+        positions = self.pairs[self.class_ID_res[class_positions], cottage_ID]
+        return positions[positions >= 0]
+
+    def cottage_day_final(self, cottage_ID, day, final_day): return self.in_cottage(self.by_class_day_final.get((self.profiles[cottage_ID], day, final_day), self.empty), cottage_ID)
+
+    def cottage_day(self, cottage_ID, day): return self.in_cottage(self.by_class_day.get((self.profiles[cottage_ID], day), self.empty), cottage_ID)
+
+    def cottage_final(self, cottage_ID, final_day): return self.in_cottage(self.by_class_final.get((self.profiles[cottage_ID], final_day), self.empty), cottage_ID)
+
+    def cottage(self, cottage_ID): return self.in_cottage(self.by_class.get(self.profiles[cottage_ID], self.empty), cottage_ID)
+
+    def reservation(self, ID_res): return self.by_reservation.get(ID_res, self.empty)
+
+    def reservation_classes(self, ID_res): return self.by_reservation_class.get(ID_res, self.empty)
+
+    def ranked_classes(self, ID_res):
+        """
+        Function that returns the class rows of a reservation, ordered by upgrade and then by fitness.
+
+        Parameters
+        ----------
+        ID_res : INT
+            ID of the reservation.
+
+        Returns
+        -------
+        (positions : np.array, boundaries : np.array)
+            Sorted row positions in the class combinations and the places where the upgrade or fitness changes.
+
+        """
+        positions = self.reservation_classes(ID_res)
+        positions = positions[np.lexsort((self.class_fitness[positions], self.class_upgrade[positions]))]
+        upgrade = self.class_upgrade[positions]
+        fitness = self.class_fitness[positions]
+        boundaries = np.flatnonzero((upgrade[1:] != upgrade[:-1]) | (fitness[1:] != fitness[:-1])) + 1
+        return positions, boundaries
+
+    def position(self, ID_res, cottage_ID):
+        """
+        Function that returns the row position of a reservation-cottage pair, or -1 if the pair is not allowed.
+        """
+        if ID_res < 0 or cottage_ID < 0 or ID_res >= self.pairs.shape[0] or cottage_ID >= self.pairs.shape[1]: return -1
+        return self.pairs[ID_res, cottage_ID]
+
+    def allowed_cottages(self, ID_res):
+        """
+        Function that returns the IDs of all cottages the reservation is allowed in.
+        """
+        return self.ID_cot[self.reservation(ID_res)]
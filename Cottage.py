@@ -1,14 +1,25 @@
+from bisect import bisect_left, bisect_right
+
 class Cottage():
     """
     Class that stores the information of a specific cottage.
     """
     def __init__(self, ID, days, startday,\
                  scores = {"Gap": 6, "GapFriToThu": -3, \
-                           "GapLegionella": 12, "Upgrade": 1}):
+                           "GapLegionella": 12, "Upgrade": 1}, debug = False):
         self.ID = ID
-        self.days = [None] * days
+        self.daycount = days
+        self.init_storage()
         self.startday = startday.weekday()
         self.scores = scores
+        self.debug = debug
+         # counters that are kept up to date on every add and remove
+        self.stays = dict()
+        self.gap_count = 0
+        self.fritothu_count = 0
+        self.upgrade_count = 0
+        self.legionella_gaps = dict()
+        self.count_gap(0, days - 1, 1)
         
         
     def add_reservation(self, reservation, start_day, days):
@@ -25,10 +36,17 @@ class Cottage():
             Days the reservation lasts.
 
         """
-        if self.days[start_day:start_day + days] != [None] * days:
+        if not self.allowed_reservation(reservation, start_day, days):
             print("!!! reservationspace not free")
             return
-        else: self.days[start_day:start_day + days] = [reservation] * days
+        gap_start, gap_end = self.free_run(start_day, start_day + days - 1)
+        self.count_gap(gap_start, gap_end, -1)
+        self.occupy(reservation, start_day, start_day + days - 1)
+        self.count_gap(gap_start, start_day - 1, 1)
+        self.count_gap(start_day + days, gap_end, 1)
+        self.stays[reservation[0]] = (reservation, start_day, start_day + days - 1)
+        if reservation[1]: self.upgrade_count += 1
+        if self.debug: self.check_counters()
     
     def remove_reservation(self, reservation):
         """
@@ -40,11 +58,17 @@ class Cottage():
             Tuple that stores the reservation ID and wheter or not this is an upgrade.
 
         """
-        if reservation not in self.days or reservation == None: 
+        if reservation == None or reservation[0] not in self.stays or self.stays[reservation[0]][0] != reservation: 
             print("!!! reservation not in cottage")
             return
-        for i, day in enumerate(self.days):
-            if day == reservation: self.days[i] = None
+        reservation, start_day, end_day = self.stays.pop(reservation[0])
+        self.vacate(start_day, end_day)
+        gap_start, gap_end = self.free_run(start_day, end_day)
+        self.count_gap(gap_start, start_day - 1, -1)
+        self.count_gap(end_day + 1, gap_end, -1)
+        self.count_gap(gap_start, gap_end, 1)
+        if reservation[1]: self.upgrade_count -= 1
+        if self.debug: self.check_counters()
     
     def allowed_reservation(self, reservation, start_day, days):
         """
@@ -64,8 +88,34 @@ class Cottage():
         bool
             Boolean that discribes if a reservation is possible in this cottage.
         """
-        if self.days[start_day:start_day + days] != [None] * days: return False
-        return True
+        return self.range_free(start_day, start_day + days - 1)
+    
+    def init_storage(self):
+        """
+        Function that creates the empty storage of the reservations, subclasses override it to store them differently.
+        """
+        self.days = [None] * self.daycount
+         # sorted stays, the i-th stay is from starts[i] up to and including ends[i], for the binary searches of the free days
+        self.starts = list()
+        self.ends = list()
+    
+    def occupy(self, reservation, start_day, end_day):
+        """
+        Function that stores the reservation on its days, without any checks.
+        """
+        self.days[start_day:end_day + 1] = [reservation] * (end_day - start_day + 1)
+        i = bisect_left(self.starts, start_day)
+        self.starts.insert(i, start_day)
+        self.ends.insert(i, end_day)
+    
+    def vacate(self, start_day, end_day):
+        """
+        Function that empties the days of a reservation, without any checks.
+        """
+        self.days[start_day:end_day + 1] = [None] * (end_day - start_day + 1)
+        i = bisect_left(self.starts, start_day)
+        del self.starts[i]
+        del self.ends[i]
     
     def calculate_score(self, return_sort = None):
         """
@@ -128,6 +178,186 @@ class Cottage():
         if return_sort == "fritothu": return fritothu_gap
         return score
     
+    def free_day(self, day, vacated = None):
+        """
+        Function that returns if a day is empty, where the days of vacated count as empty.
+        """
+        return self.range_free(day, day, vacated)
+    
+    def range_free(self, start_day, end_day, vacated = None):
+        """
+        Function that tests if all days of a range are empty.
+
+        Parameters
+        ----------
+        start_day : INT
+            First day of the range.
+        end_day : INT
+            Last day of the range.
+        vacated : (start_day : INT, end_day : INT), optional
+            Days of a stay that count as empty. The default is None.
+
+        Returns
+        -------
+        BOOL
+            True if the range lies in the cottage and all its days are empty.
+
+        """
+        if start_day < 0 or end_day > self.daycount - 1: return False
+        i = bisect_right(self.starts, end_day) - 1
+        if i >= 0 and vacated != None and self.starts[i] == vacated[0]: i -= 1
+        if i >= 0 and self.ends[i] >= start_day: return False
+        return True
+    
+    def free_run(self, first_day, last_day, vacated = None):
+        """
+        Function that finds the first and last day of the empty stretch around a range of empty days.
+
+        Parameters
+        ----------
+        first_day : INT
+            First day of the empty range.
+        last_day : INT
+            Last day of the empty range.
+        vacated : (start_day : INT, end_day : INT), optional
+            Days of a stay that count as empty. The default is None.
+
+        Returns
+        -------
+        (gap_start : INT, gap_end : INT)
+            tuple with the first and last day of the gap that contains the range.
+
+        """
+        i = bisect_left(self.starts, first_day)
+        left = i - 1
+        if left >= 0 and vacated != None and self.starts[left] == vacated[0]: left -= 1
+        if i < len(self.starts) and vacated != None and self.starts[i] == vacated[0]: i += 1
+        gap_start = self.ends[left] + 1 if left >= 0 else 0
+        gap_end = self.starts[i] - 1 if i < len(self.starts) else self.daycount - 1
+        return gap_start, gap_end
+    
+    def gap_value(self, gap_start, gap_end):
+        """
+        Function that returns the score of a single gap, or 0 if gap_end is before gap_start.
+        """
+        if gap_end < gap_start: return 0
+        value = self.scores["Gap"] + self.fritothu_weeks(gap_start, gap_end) * self.scores["GapFriToThu"]
+        if gap_end - gap_start + 1 >= 22: value += self.scores["GapLegionella"]
+        return value
+    
+    def change_score(self, removed = None, added = None):
+        """
+        Function that calculates how the score changes if a stay is removed and/or another stay is added, 
+        without changing the cottage. Only the gaps next to the stays are looked at.
+
+        Parameters
+        ----------
+        removed : (start_day : INT, end_day : INT, upgrade : BOOL), optional
+            Stay in the cottage that will be removed. The default is None.
+        added : (start_day : INT, end_day : INT, upgrade : BOOL), optional
+            Stay that will be added after the removal. The default is None.
+
+        Returns
+        -------
+        delta : INT or None
+            New score minus current score, or None if the added stay does not fit.
+
+        """
+        delta = 0
+        vacated = None
+        if removed != None:
+            vacated = removed[:2]
+            gap_start, gap_end = self.free_run(removed[0], removed[1], vacated)
+            delta += self.gap_value(gap_start, gap_end) - self.gap_value(gap_start, removed[0] - 1) - self.gap_value(removed[1] + 1, gap_end)
+            if removed[2]: delta -= self.scores["Upgrade"]
+        if added != None:
+            if not self.range_free(added[0], added[1], vacated): return None
+            gap_start, gap_end = self.free_run(added[0], added[1], vacated)
+            delta += self.gap_value(gap_start, added[0] - 1) + self.gap_value(added[1] + 1, gap_end) - self.gap_value(gap_start, gap_end)
+            if added[2]: delta += self.scores["Upgrade"]
+        return delta
+    
+    def overlapping(self, start_day, end_day):
+        """
+        Function that returns the IDs of the reservations with a stay that overlaps the days from start_day up to and including end_day.
+        """
+        return [ID for ID, stay in self.stays.items() if stay[1] <= end_day and stay[2] >= start_day]
+    
+    def fritothu_weeks(self, gap_start, gap_end):
+        """
+        Function that counts the full friday to thursday weeks in a gap.
+
+        Parameters
+        ----------
+        gap_start : INT
+            first day of the gap.
+        gap_end : INT
+            last day of the gap.
+
+        Returns
+        -------
+        INT
+            amount of fridays in the gap that are followed by the full week.
+
+        """
+        first_friday = gap_start + (4 - self.startday - gap_start) % 7
+        if first_friday + 6 > gap_end: return 0
+        return (gap_end - 6 - first_friday) // 7 + 1
+    
+    def count_gap(self, gap_start, gap_end, sign):
+        """
+        Function that adds or subtracts a gap from the counters.
+
+        Parameters
+        ----------
+        gap_start : INT
+            first day of the gap.
+        gap_end : INT
+            last day of the gap, if it is before gap_start nothing is counted.
+        sign : INT
+            1 to add the gap, -1 to remove the gap.
+
+        """
+        if gap_end < gap_start: return
+        self.gap_count += sign
+        self.fritothu_count += sign * self.fritothu_weeks(gap_start, gap_end)
+        if gap_end - gap_start + 1 >= 22:
+            if sign > 0: self.legionella_gaps[gap_start] = gap_end
+            else: del self.legionella_gaps[gap_start]
+    
+    def check_counters(self):
+        """
+        Function that compares the counters with a full recalculation (debug mode).
+
+        Returns
+        -------
+        BOOL
+            True if the counters match the full recalculation.
+
+        """
+        counted = (self.counter_score(), self.gap_count, self.legionella_summary(), self.fritothu_count)
+        calculated = (self.calculate_score(), self.calculate_score(return_sort = "gap"), \
+                      self.calculate_score(return_sort = "legionella"), self.calculate_score(return_sort = "fritothu"))
+        if counted != calculated:
+            print("!!! counters of cottage {} are {} but should be {}".format(self.ID, counted, calculated))
+            return False
+        return True
+    
+    def counter_score(self):
+        """
+        Function that calculates the total score from the counters.
+        """
+        return self.gap_count * self.scores["Gap"] + self.fritothu_count * self.scores["GapFriToThu"] + \
+               len(self.legionella_gaps) * self.scores["GapLegionella"] + self.upgrade_count * self.scores["Upgrade"]
+    
+    def legionella_summary(self):
+        """
+        Function that returns the amount of legionella gaps and the first and last day of the last one.
+        """
+        if len(self.legionella_gaps) == 0: return (0, 0, 0)
+        legionella_start = max(self.legionella_gaps)
+        return (len(self.legionella_gaps), legionella_start, self.legionella_gaps[legionella_start])
+    
     def display_days(self):
         """
         Function that prints the list of all days.
@@ -154,9 +384,7 @@ class Cottage():
             tuple with reservation ID and wheter or not it is an upgrade in this cottage.
 
         """
-        for day in self.days:
-            if day != None:
-                if day[0] == reservation_ID: return day
+        if reservation_ID in self.stays: return self.stays[reservation_ID][0]
     
     def empty_day(self, day):
         """
@@ -173,9 +401,12 @@ class Cottage():
             True if day is empty, False if day is not empty.
 
         """
-        if day == -1 or day > len(self.days) - 1: return False
-        if self.days[day] == None: return True
-        return False
+        if day == -1 or day > self.daycount - 1: return False
+         # other negative days count from the back, like indexing the list of days does
+        if day < 0: day += self.daycount
+        i = bisect_right(self.starts, day)
+        if i > 0 and self.ends[i - 1] >= day: return False
+        return True
                 
     
     def remove_no_legionella(self, reservation_ID):
@@ -193,14 +424,11 @@ class Cottage():
             True if it can be removed without creating legionella, False if it would create legionella.
 
         """
-        reservation = self.find_reservation(reservation_ID)
-        count = 0
-        for day in self.days:
-            if day == None or day == reservation:
-                count += 1
-                if count == 22: return False
-            else: count = 0
-        return True
+        if len(self.legionella_gaps) > 0: return False
+        if reservation_ID not in self.stays: return True
+        reservation, start_day, end_day = self.stays[reservation_ID]
+        gap_start, gap_end = self.free_run(start_day, end_day, (start_day, end_day))
+        return gap_end - gap_start + 1 < 22
     
     def is_upgrade(self, reservation_ID): return self.find_reservation(reservation_ID)[1]
     
@@ -240,29 +468,34 @@ class Cottage():
     
                 
     @property
-    def score(self): return self.calculate_score()
+    def score(self):
+        if self.debug: self.check_counters()
+        return self.counter_score()
     
     @property
-    def reservations(self):
-        items = set(self.days)
-        if None in items: items.remove(None)
-        return list(items)
+    def reservations(self): return [stay[0] for stay in self.stays.values()]
     
     @property
     def upgrades(self):
-        total = 0
-        for reservation in self.reservations:
-            if reservation[1]: total += self.scores["Upgrade"]
-        return total
+        if self.debug: self.check_counters()
+        return self.upgrade_count * self.scores["Upgrade"]
     
     @property
-    def gaps(self): return self.calculate_score(return_sort = "gap")
+    def gaps(self):
+        if self.debug: self.check_counters()
+        return self.gap_count
     
     @property
-    def legionellas(self): return self.calculate_score(return_sort = "legionella")[0]
+    def legionellas(self):
+        if self.debug: self.check_counters()
+        return len(self.legionella_gaps)
     
     @property
-    def legionella_edges(self): return self.calculate_score(return_sort = "legionella")
+    def legionella_edges(self):
+        if self.debug: self.check_counters()
+        return self.legionella_summary()
     
     @property
-    def fritothus(self): return self.calculate_score(return_sort = "fritothu")
\ No newline at end of file
+    def fritothus(self):
+        if self.debug: self.check_counters()
+        return self.fritothu_count
\ No newline at end of file
@@ -0,0 +1,32 @@
+from math import inf
+from time import time
+
+class Deadline():
+    """
+    Class that tells the optimisers when to stop. One deadline can be given to several optimisers, so they share
+    the same time budget, and cancel stops all of them the next time they check it.
+    """
+    def __init__(self, max_time = None):
+        self.end = None if max_time == None else time() + max_time
+        self.cancelled = False
+
+
+    def cancel(self):
+        """
+        Function that makes the deadline expire now.
+        """
+        self.cancelled = True
+
+    def expired(self):
+        """
+        Function that returns True when the time is over or the deadline is cancelled.
+        """
+        return self.cancelled or (self.end != None and time() > self.end)
+
+    def remaining(self):
+        """
+        Function that returns the seconds that are left, inf if there is no time limit.
+        """
+        if self.cancelled: return 0
+        if self.end == None: return inf
+        return max(0, self.end - time())
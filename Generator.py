@@ -0,0 +1,105 @@
+import argparse
+import numpy as np
+import pandas as pd
+
+restrictionlist = ["Class", "Face South", "Near Playground", \
+                   "Close to the Centre", "Near Lake ", \
+                   "Near car park", "Accessible for Wheelchair", \
+                   "Child Friendly", "Dish Washer ", \
+                   "Wi-Fi Coverage ", "Covered Terrace"]
+
+def generate(seed = 0, cottages = 40, season_days = 120, occupancy = 0.85, fixed_ratio = 0.03, profiles = 8, \
+             start_date = "2022-03-04", restrictionlist = restrictionlist):
+    """
+    Function that creates a random park with reservations that all fit, with the same columns as the Excel datasets.
+    The reservations are made per cottage, so the cottage they are made for is a feasible planning.
+
+    Parameters
+    ----------
+    seed : INT, optional
+        Seed of the random generator. The default is 0.
+    cottages : INT, optional
+        Amount of cottages. The default is 40.
+    season_days : INT, optional
+        Amount of days in which reservations can arrive. The default is 120.
+    occupancy : FLOAT, optional
+        Part of the days the cottages are about to be occupied. The default is 0.85.
+    fixed_ratio : FLOAT, optional
+        Part of the reservations that are fixed to their cottage. The default is 0.03.
+    profiles : INT, optional
+        Amount of different kinds of cottages. The default is 8.
+    start_date : STR, optional
+        First day of the season. The default is "2022-03-04".
+    restrictionlist : list, optional
+        Class followed by the attributes of the cottages. The default is the restrictionlist of the Planner.
+
+    Returns
+    -------
+    df_cottages : pd.DataFrame
+        DataFrame with the ID, "Max # Pers" and restrictions of every cottage.
+    df_reservations : pd.DataFrame
+        DataFrame with the ID, "Arrival Date", "Length of Stay", "# Persons", "Cottage (Fixed)" and restrictions of every reservation.
+    df_validator : pd.DataFrame
+        DataFrame with the ID of every reservation and the cottage it was made for.
+
+    """
+    rng = np.random.default_rng(seed)
+    kinds = list()
+    for i in range(profiles):
+        kind = {"Max # Pers": int(rng.choice([2, 4, 6, 8])), restrictionlist[0]: int(rng.integers(1, 4))}
+        for restriction in restrictionlist[1:]: kind[restriction] = int(rng.random() < 0.5)
+        kinds.append(kind)
+    df_cottages = pd.DataFrame([{"ID": ID, **kinds[int(rng.integers(profiles))]} for ID in range(1, cottages + 1)])
+    start = pd.Timestamp(start_date)
+    reservations = list()
+    for cottage in df_cottages.to_dict("records"):
+        day = int(rng.integers(0, 3))
+        while day < season_days:
+            length = int(rng.choice([2, 3, 4, 7, 7, 10, 14]))
+            reservation = {"Arrival Date": start + pd.Timedelta(days = day), "Length of Stay": length, \
+                           "# Persons": int(rng.integers(1, cottage["Max # Pers"] + 1)), \
+                           "Cottage (Fixed)": cottage["ID"] if rng.random() < fixed_ratio else 0, \
+                           restrictionlist[0]: int(rng.integers(1, cottage[restrictionlist[0]] + 1))}
+            for restriction in restrictionlist[1:]: reservation[restriction] = int(cottage[restriction] and rng.random() < 0.3)
+            reservation["Cottage"] = cottage["ID"]
+            reservations.append(reservation)
+             # empty days between stays, with now and then a long gap
+            day += length + int(rng.poisson(5 * (1 - occupancy) / occupancy))
+            if rng.random() < 0.06: day += int(rng.integers(15, 30))
+    df_reservations = pd.DataFrame(reservations).sample(frac = 1, random_state = seed).reset_index(drop = True)
+    df_reservations.insert(0, "ID", range(1, len(df_reservations) + 1))
+    df_validator = df_reservations[["ID", "Cottage"]]
+    return df_cottages, df_reservations.drop(columns = ["Cottage"]), df_validator
+
+def store(filename, df_cottages, df_reservations, df_validator, cottage_sheet = "Cottages", reservations_sheet = "Reservations", \
+          validator_sheet = "Validator"):
+    """
+    Function that stores a generated park. The format depends on the extension of filename:
+    .xlsx gives one workbook with a sheet per DataFrame, .csv gives a file per sheet with the sheet name added
+    and .pkl gives one pickle with a dictionary of the DataFrames by sheet name.
+    """
+    sheets = {cottage_sheet: df_cottages, reservations_sheet: df_reservations, validator_sheet: df_validator}
+    if filename.endswith(".xlsx"):
+        with pd.ExcelWriter(filename) as writer:
+            for sheet, df in sheets.items(): df.to_excel(writer, sheet_name = sheet, index = False)
+    elif filename.endswith(".csv"):
+        for sheet, df in sheets.items(): df.to_csv("{} {}.csv".format(filename[:-4], sheet), index = False)
+    elif filename.endswith(".pkl"): pd.to_pickle(sheets, filename)
+    else: print("!!! unknown file type of {}, use .xlsx, .csv or .pkl".format(filename))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Creates a random park with reservations for the Planner.")
+    parser.add_argument("filename", help = "file to write, ending in .xlsx, .csv or .pkl")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--cottages", type = int, default = 40)
+    parser.add_argument("--season-days", type = int, default = 120)
+    parser.add_argument("--occupancy", type = float, default = 0.85)
+    parser.add_argument("--fixed-ratio", type = float, default = 0.03)
+    parser.add_argument("--profiles", type = int, default = 8)
+    parser.add_argument("--start-date", default = "2022-03-04")
+    arguments = parser.parse_args()
+    park = generate(arguments.seed, arguments.cottages, arguments.season_days, arguments.occupancy, \
+                    arguments.fixed_ratio, arguments.profiles, arguments.start_date)
+    store(arguments.filename, *park)
+    print("stored {} cottages and {} reservations in {}".format(len(park[0]), len(park[1]), arguments.filename))
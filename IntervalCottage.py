@@ -0,0 +1,53 @@
+from bisect import bisect_left
+from Cottage import Cottage
+
+class IntervalCottage(Cottage):
+    """
+    Cottage that stores its reservations as a sorted list of stays instead of one entry per day.
+    It has the same methods as Cottage, so it can be used by the Planner in the same way.
+    Only the storage is different, the rest of the setup is done by Cottage.__init__.
+    """
+    def init_storage(self):
+        """
+        Function that creates the empty list of stays, without a list of days.
+        """
+         # sorted stays, the i-th stay is occupants[i] from starts[i] up to and including ends[i]
+        self.starts = list()
+        self.ends = list()
+        self.occupants = list()
+
+    def occupy(self, reservation, start_day, end_day):
+        """
+        Function that stores the reservation as a stay, without any checks.
+        """
+        i = bisect_left(self.starts, start_day)
+        self.starts.insert(i, start_day)
+        self.ends.insert(i, end_day)
+        self.occupants.insert(i, reservation)
+
+    def vacate(self, start_day, end_day):
+        """
+        Function that removes the stay that starts on start_day, without any checks.
+        """
+        i = bisect_left(self.starts, start_day)
+        del self.starts[i]
+        del self.ends[i]
+        del self.occupants[i]
+
+    def compressed_days(self):
+        compressed = list()
+        day = 0
+        for start_day, end_day, reservation in zip(self.starts, self.ends, self.occupants):
+            if start_day > day: compressed.append((None, day, start_day - 1))
+            compressed.append((reservation, start_day, end_day))
+            day = end_day + 1
+        if day < self.daycount: compressed.append((None, day, self.daycount - 1))
+        return compressed
+
+
+    @property
+    def days(self):
+        days = [None] * self.daycount
+        for start_day, end_day, reservation in zip(self.starts, self.ends, self.occupants):
+            days[start_day:end_day + 1] = [reservation] * (end_day - start_day + 1)
+        return days
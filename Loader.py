@@ -0,0 +1,121 @@
+import hashlib
+import importlib.util
+import json
+import os
+import numpy as np
+import pandas as pd
+from Planner import prepare_reservations
+
+def parquet_available():
+    """
+    Function that tests if pyarrow is installed, without importing it.
+    """
+    return importlib.util.find_spec("pyarrow") != None
+
+ # parquet needs pyarrow, without it the cache is stored as pickles
+cache_format = "parquet" if parquet_available() else "pkl"
+
+ # columns with a fixed small type, the other integer columns are made as small as their values allow
+column_types = {"ID": np.int32, "Cottage (Fixed)": np.int32, "Length of Stay": np.int16, "day": np.int16, "final_day": np.int16}
+
+def file_hash(filename):
+    """
+    Function that returns the sha256 hash of the contents of a file.
+    """
+    digest = hashlib.sha256()
+    with open(filename, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""): digest.update(block)
+    return digest.hexdigest()
+
+def compact(df):
+    """
+    Function that gives the integer columns of a DataFrame the smallest type that fits.
+    """
+    for column in df.columns:
+        if column in column_types: df[column] = df[column].astype(column_types[column])
+        elif pd.api.types.is_integer_dtype(df[column]): df[column] = pd.to_numeric(df[column], downcast = "integer")
+    return df
+
+def write_frame(df, filename):
+    """
+    Function that stores a DataFrame in the cache format.
+    """
+    if cache_format == "parquet": df.to_parquet(filename)
+    else: df.to_pickle(filename)
+
+def read_frame(filename):
+    """
+    Function that reads a DataFrame in the cache format.
+    """
+    if cache_format == "parquet": return pd.read_parquet(filename)
+    return pd.read_pickle(filename)
+
+def load_dataset(database, cottage_sheet = "Cottages", reservations_sheet = "Reservations", validator_sheet = None, cache_dir = None, prepare = True):
+    """
+    Function that reads the cottages, reservations and (optionally) the assignments of a workbook.
+    The first time the workbook is read it is stored in a cache with compact types, both as read and with the days of the Planner added,
+    so later runs don't need to read the Excel file. The cache is used again as long as the workbook has the same
+    modification time and size, or otherwise the same hash.
+
+    Parameters
+    ----------
+    database : STR
+        Filename of the workbook.
+    cottage_sheet : STR, optional
+        Name of the sheet with the cottages. The default is "Cottages".
+    reservations_sheet : STR, optional
+        Name of the sheet with the reservations. The default is "Reservations".
+    validator_sheet : STR, optional
+        Name of the sheet with the assigned cottage of every reservation, None to skip it. The default is None.
+    cache_dir : STR, optional
+        Folder of the cache, None uses a folder "cache" next to the workbook. The default is None.
+    prepare : BOOL, optional
+        True to return the reservations with prepare_reservations applied, False to return them as in the workbook. The default is True.
+
+    Returns
+    -------
+    cottages : pd.DataFrame
+        DataFrame with the cottages.
+    reservations : pd.DataFrame
+        DataFrame with the reservations, including "day" and "final_day" if prepare is True.
+    assignments : pd.Series
+        Series with reservation_ID as index and cottage number as value, or None without validator_sheet.
+
+    """
+    if cache_dir == None: cache_dir = os.path.join(os.path.dirname(os.path.abspath(database)), "cache")
+    name = os.path.join(cache_dir, os.path.basename(database))
+    sheets = [cottage_sheet, reservations_sheet] + ([validator_sheet] if validator_sheet != None else [])
+    filenames = ["{}.{}.{}".format(name, sheet, cache_format) for sheet in sheets]
+     # the reservations as in the workbook, without the changes of prepare_reservations
+    raw_filename = "{}.{}.raw.{}".format(name, reservations_sheet, cache_format)
+    status = os.stat(database)
+    meta = None
+    if os.path.exists(name + ".json"):
+        with open(name + ".json") as file: meta = json.load(file)
+    digest = None
+    if meta != None and meta["sheets"] == sheets and all(os.path.exists(filename) for filename in filenames + [raw_filename]):
+        if meta["mtime"] != status.st_mtime or meta["size"] != status.st_size:
+            digest = file_hash(database)
+            if digest != meta["hash"]: meta = None
+    else: meta = None
+    if meta == None:
+        frames = pd.read_excel(database, sheet_name = sheets)
+        cottages = compact(frames[cottage_sheet])
+        raw_reservations = compact(frames[reservations_sheet].copy())
+        reservations = compact(prepare_reservations(cottages, frames[reservations_sheet]))
+        os.makedirs(cache_dir, exist_ok = True)
+        write_frame(cottages, filenames[0])
+        write_frame(reservations, filenames[1])
+        write_frame(raw_reservations, raw_filename)
+        if validator_sheet != None: write_frame(compact(frames[validator_sheet].iloc[:, :2]), filenames[2])
+        meta = {"sheets": sheets, "hash": digest if digest != None else file_hash(database)}
+    meta["mtime"] = status.st_mtime
+    meta["size"] = status.st_size
+    with open(name + ".json", "w") as file: json.dump(meta, file)
+    cottages = read_frame(filenames[0])
+    reservations = read_frame(filenames[1] if prepare else raw_filename)
+    assignments = None
+    if validator_sheet != None:
+        validator = read_frame(filenames[2])
+        assignments = validator.set_index(validator.columns[0])[validator.columns[1]]
+    return cottages, reservations, assignments
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+class Occupancy():
+    """
+    Class that stores the planning of the whole park in one array of cottages by days,
+    so all cottages can be scored and validated at once.
+    """
+    def __init__(self, cottage_IDs, reservation_IDs, daycount, start_weekday,\
+                 scores = {"Gap": 6, "GapFriToThu": -3, \
+                           "GapLegionella": 12, "Upgrade": 1}):
+        self.cottage_IDs = np.asarray(cottage_IDs)
+        self.reservation_IDs = np.asarray(reservation_IDs)
+        self.cottage_rows = pd.Series(np.arange(len(self.cottage_IDs)), index = self.cottage_IDs)
+        self.reservation_indices = pd.Series(np.arange(len(self.reservation_IDs)), index = self.reservation_IDs)
+        self.daycount = daycount
+        self.start_weekday = start_weekday
+        self.scores = scores
+         # index of the reservation on each cottage-day, -1 if the day is empty
+        self.matrix = np.full((len(self.cottage_IDs), daycount), -1, dtype = np.int32)
+        self.upgrade = np.zeros((len(self.cottage_IDs), daycount), dtype = bool)
+        self.overlaps = np.zeros((0, 2), dtype = np.int64)
+
+
+    @classmethod
+    def from_assignments(cls, planner, assignments):
+        """
+        Function that creates the occupancy of an assignment of reservations to cottages.
+
+        Parameters
+        ----------
+        planner : Planner
+            Planner with the reservations, cottages and combinations.
+        assignments : pd.Series
+            Series with reservation_ID as index and cottage number as value.
+
+        Returns
+        -------
+        occupancy : Occupancy
+            Occupancy with all allowed reservations of the assignment filled in.
+        rejected : pd.DataFrame
+            The assigned reservation-cottage pairs that are not allowed.
+
+        """
+        cottage = next(iter(planner.cottages.values()))
+        occupancy = cls(list(planner.cottages), planner.df_reservations["ID"].to_numpy(), \
+                        cottage.daycount, planner.start_weekday, cottage.scores)
+        assigned = pd.DataFrame({"ID_res": assignments.index.to_numpy(), "ID_cot": assignments.to_numpy()})
+        assigned = pd.merge(assigned, planner.combinations[["ID_res", "ID_cot", "day", "final_day", "upgrade"]], \
+                            how = "left", on = ["ID_res", "ID_cot"], indicator = True)
+        rejected = assigned[assigned["_merge"] != "both"][["ID_res", "ID_cot"]]
+        assigned = assigned[assigned["_merge"] == "both"]
+        occupancy.fill(occupancy.reservation_indices[assigned["ID_res"]].to_numpy(), \
+                       occupancy.cottage_rows[assigned["ID_cot"]].to_numpy(), \
+                       assigned["day"].to_numpy(dtype = np.int64), assigned["final_day"].to_numpy(dtype = np.int64), \
+                       assigned["upgrade"].to_numpy(dtype = bool))
+        return occupancy, rejected
+
+
+    def fill(self, reservations, rows, start_days, end_days, upgrades):
+        """
+        Function that puts stays in the matrix. Days that are claimed by more than one stay are stored in self.overlaps.
+
+        Parameters
+        ----------
+        reservations : np.array
+            Reservation indices of the stays.
+        rows : np.array
+            Cottage rows of the stays.
+        start_days : np.array
+            First day of each stay.
+        end_days : np.array
+            Last day of each stay.
+        upgrades : np.array
+            Whether or not each stay is an upgrade.
+
+        """
+        lengths = end_days - start_days + 1
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        cell_rows = np.repeat(rows, lengths)
+        cell_days = np.repeat(start_days, lengths) + offsets
+        claims = np.zeros(self.matrix.shape, dtype = np.int32)
+        np.add.at(claims, (cell_rows, cell_days), 1)
+        claims[self.matrix >= 0] += 1
+        self.overlaps = np.argwhere(claims > 1)
+        self.matrix[cell_rows, cell_days] = np.repeat(reservations, lengths)
+        self.upgrade[cell_rows, cell_days] = np.repeat(upgrades, lengths)
+
+
+    def empty_runs(self):
+        """
+        Function that finds all gaps in all cottages.
+
+        Returns
+        -------
+        rows, gap_starts, gap_ends : np.array
+            Cottage row, first day and last day of every gap.
+
+        """
+        padded = np.zeros((self.matrix.shape[0], self.daycount + 2), dtype = np.int8)
+        padded[:, 1:-1] = self.matrix < 0
+        edges = np.diff(padded, axis = 1)
+        rows, gap_starts = np.nonzero(edges == 1)
+        gap_ends = np.nonzero(edges == -1)[1] - 1
+        return rows, gap_starts, gap_ends
+
+
+    def cottage_counts(self):
+        """
+        Function that counts the gaps, legionella gaps, fri to thu gaps, upgrades and score of every cottage.
+
+        Returns
+        -------
+        counts : pd.DataFrame
+            DataFrame with the cottage IDs as index and a column for every count.
+
+        """
+        cottagecount = self.matrix.shape[0]
+        rows, gap_starts, gap_ends = self.empty_runs()
+        first_fridays = gap_starts + (4 - self.start_weekday - gap_starts) % 7
+        weeks = np.where(first_fridays + 6 <= gap_ends, (gap_ends - 6 - first_fridays) // 7 + 1, 0)
+        new_stay = np.ones(self.matrix.shape, dtype = bool)
+        new_stay[:, 1:] = self.matrix[:, 1:] != self.matrix[:, :-1]
+        counts = pd.DataFrame(index = self.cottage_IDs)
+        counts["gap"] = np.bincount(rows, minlength = cottagecount)
+        counts["legionella"] = np.bincount(rows[gap_ends - gap_starts + 1 >= 22], minlength = cottagecount)
+        counts["fritothu"] = np.bincount(rows, weights = weeks, minlength = cottagecount).astype(np.int64)
+        counts["upgrade"] = (new_stay & self.upgrade & (self.matrix >= 0)).sum(axis = 1)
+        counts["score"] = counts["gap"] * self.scores["Gap"] + counts["fritothu"] * self.scores["GapFriToThu"] + \
+                          counts["legionella"] * self.scores["GapLegionella"] + counts["upgrade"] * self.scores["Upgrade"]
+        return counts
+
+
+    def unassigned(self):
+        """
+        Function that returns the IDs of the reservations that are not in the matrix.
+        """
+        present = np.zeros(len(self.reservation_IDs), dtype = bool)
+        present[self.matrix[self.matrix >= 0]] = True
+        return self.reservation_IDs[~present]
+
+
+    def totals(self):
+        """
+        Function that returns the total score and counts of the park.
+        """
+        return self.cottage_counts().sum()
@@ -1,13 +1,33 @@
  # import modules
 import pandas as pd
-from time import time
+import numpy as np
+from time import time, perf_counter, sleep, process_time
 from Cottage import Cottage
+from Occupancy import Occupancy
+from CandidateIndex import CandidateIndex
+from SlotIndex import SlotIndex
+from Annealer import Annealer, init_worker, run_worker, replica_worker
+from Deadline import Deadline
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Process, Pipe
+from copy import copy
 import openpyxl
-from math import exp
-from random import random, choice, randint
-from math import log10
+from math import exp, inf
+from random import random, choice, choices, randint, getstate, setstate
+from inspect import signature
+import pickle
+import os
 pd.options.mode.chained_assignment = None
 
+ # operators of adaptive_optimiser: optimisers with a _steps generator and the arguments they are run with
+adaptive_operators = {"gaps_optimiser": {},
+                      "legionella_optimiser": {},
+                      "upgrade_optimiser": {},
+                      "assign_improvements_simulated": {"temperature_init_mul": 0.00001},
+                      "assign_improvements_annealing": {},
+                      "lns_optimiser": {},
+                      "ejection_chain_optimiser": {}}
+
  # Planner class
 class Planner():
     """
@@ -18,70 +38,322 @@ class Planner():
                        "Close to the Centre", "Near Lake ", \
                        "Near car park", "Accessible for Wheelchair", \
                        "Child Friendly", "Dish Washer ", \
-                       "Wi-Fi Coverage ", "Covered Terrace"]):
+                       "Wi-Fi Coverage ", "Covered Terrace"], debug = False, cottage_type = Cottage, block_size = 1000, \
+                       telemetry = None, verbose = True):
         self.start_time = time()
+        self.telemetry = telemetry
+        self.verbose = verbose
         self.print_time("starting Planner init")
-         # Add day (0 is earliest reservation day) and departure day
+         # the days are already added when the reservations come from the cache of Loader
+        if "day" not in reservations.columns or "final_day" not in reservations.columns: prepare_reservations(cottages, reservations)
         earliest_day = reservations["Arrival Date"].min()
         self.start_weekday = earliest_day.weekday()
-        reservations["day"] = reservations["Arrival Date"].apply(lambda x: (x-earliest_day).days)
-        reservations["final_day"] = reservations["day"].add(reservations["Length of Stay"]).add(-1)
-        reservations["final_day"] = reservations['final_day'].clip(upper = reservations["day"].max())
-        reservations["Length of Stay"] = reservations["final_day"].subtract(reservations["day"]).add(1)
-         # Changes "# persons" for reservations to nearest higher or equal "max # pers"
-        cottage_Max_pers = cottages["Max # Pers"].unique().tolist()
-        cottage_Max_pers.append(0)
-        cottage_Max_pers.sort()
-        for i in range(len(cottage_Max_pers) - 1): reservations.loc[(cottage_Max_pers[i] < reservations["# Persons"]).multiply(reservations["# Persons"] < cottage_Max_pers[i + 1]), "# Persons"] = cottage_Max_pers[i + 1]
 
         self.df_cottages = cottages
         self.df_reservations = reservations
-        self.cottage_digits = int(log10(self.df_cottages["ID"].max())) + 1
-        self.reservation_digits = int(log10(self.df_reservations["ID"].max())) + 1
+        self.cottage_stride = int(self.df_cottages["ID"].max()) + 1
         self.restrictionlist = restrictionlist
-        self.combinations = self.combine()
-        daycount = reservations["final_day"].max() + 1
-        self.cottages = dict()
-        for ID in cottages["ID"].tolist(): self.cottages[ID] = Cottage(ID, daycount, earliest_day)
+        self.block_size = block_size
+        self.cottage_profiles = self.find_profiles()
+        self.class_combinations, self.combinations = self.combine()
+        self.build(debug, cottage_type)
         self.print_time("finished Planner init")
     
     
-    def print_time(self, msg = ""): print(msg + "   --- %s seconds ---" % (time() - self.start_time))
+    def build(self, debug, cottage_type):
+        """
+        Function that creates the candidate index and the empty cottages from the combinations.
+        """
+        self.profiles = dict()
+        for ID, profile in self.cottage_profiles.items(): self.profiles.setdefault(profile, list()).append(ID)
+        self.candidate_index = CandidateIndex(self.combinations, self.class_combinations, self.cottage_profiles)
+        earliest_day = self.df_reservations["Arrival Date"].min()
+        daycount = self.df_reservations["final_day"].max() + 1
+        self.cottages = dict()
+        for ID in self.df_cottages["ID"].tolist(): self.cottages[ID] = cottage_type(ID, daycount, earliest_day, debug = debug)
+        self.assignment_index = dict()
+        self.slots = SlotIndex(daycount)
+         # (stage, seconds spent in that stage) where run_pipeline starts
+        self.resume = (0, 0)
+         # generator of the seeds of the parts of a stage and the temperature the last part ended with
+        self.rng = np.random.default_rng()
+        self.temperature = None
+        self.checkpoint_static = None
+    
+    @classmethod
+    def from_checkpoint(cls, filename, debug = False, cottage_type = Cottage, telemetry = None, verbose = True):
+        """
+        Function that creates a planner from a checkpoint of save_checkpoint, without calculating the combinations again.
+        The assignments, the state of the random generators and the stage of run_pipeline are restored.
+
+        Parameters
+        ----------
+        filename : STR
+            Filename of the checkpoint.
+
+        Returns
+        -------
+        planner : Planner
+            The planner of the checkpoint.
+
+        """
+        planner = cls.__new__(cls)
+        planner.start_time = time()
+        planner.telemetry = telemetry
+        planner.verbose = verbose
+        with open(filename + ".static", "rb") as file: static = pickle.load(file)
+        with open(filename, "rb") as file: state = pickle.load(file)
+        for name, value in static.items(): setattr(planner, name, value)
+        planner.build(debug, cottage_type)
+        planner.checkpoint_static = filename
+        planner.read_assignements(pd.Series(state["assignments"], dtype = "int64"))
+        setstate(state["random_state"])
+        np.random.set_state(state["numpy_state"])
+        planner.rng.bit_generator.state = state["generator_state"]
+        planner.temperature = state["temperature"]
+        planner.resume = state["resume"]
+        planner.print_time("loaded checkpoint {} with a score of {}".format(filename, planner.score))
+        return planner
+    
+    def save_checkpoint(self, filename, resume = (0, 0)):
+        """
+        Function that stores the assignments, the state of the random generators and the stage of run_pipeline in filename.
+        The reservations, cottages and combinations don't change, they are stored once in filename + ".static".
+
+        Parameters
+        ----------
+        filename : STR
+            Filename of the checkpoint.
+        resume : (stage : INT, seconds : FLOAT), optional
+            Stage of run_pipeline and the seconds spent in it. The default is (0, 0).
+
+        """
+        if self.checkpoint_static != filename:
+            static = {"df_cottages": self.df_cottages, "df_reservations": self.df_reservations, "combinations": self.combinations, \
+                      "class_combinations": self.class_combinations, "cottage_profiles": self.cottage_profiles, \
+                      "restrictionlist": self.restrictionlist, "start_weekday": self.start_weekday, \
+                      "cottage_stride": self.cottage_stride, "block_size": self.block_size}
+            with open(filename + ".static", "wb") as file: pickle.dump(static, file, protocol = pickle.HIGHEST_PROTOCOL)
+            self.checkpoint_static = filename
+        state = {"assignments": {ID_res: assignment[0] for ID_res, assignment in self.assignment_index.items()}, \
+                 "random_state": getstate(), "numpy_state": np.random.get_state(), "generator_state": self.rng.bit_generator.state, \
+                 "temperature": self.temperature, "resume": resume}
+         # write to a temporary file first, so a crash while writing keeps the previous checkpoint
+        with open(filename + ".tmp", "wb") as file: pickle.dump(state, file, protocol = pickle.HIGHEST_PROTOCOL)
+        os.replace(filename + ".tmp", filename)
+    
+    def run_pipeline(self, stages, checkpoint = None, checkpoint_interval = None):
+        """
+        Function that runs optimisers one after another and stores a checkpoint after each of them.
+        A planner from from_checkpoint continues at the stage where the checkpoint was made.
+
+        Parameters
+        ----------
+        stages : list
+            list with a (name of the optimiser : STR, keyword arguments : dict) tuple for every stage.
+        checkpoint : STR, optional
+            Filename of the checkpoint, None stores no checkpoints. The default is None.
+        checkpoint_interval : FLOAT, optional
+            If given, stages with a max_time are run in parts of at most this many seconds with a checkpoint after every part.
+            A part gets its seed from the seed of the stage, and a part of a simulated annealing stage starts at the temperature 
+            the previous part ended with, so a resumed run continues like a run that was not stopped. The default is None.
+
+        """
+        stage, spent = self.resume
+        while stage < len(stages):
+            name, arguments = stages[stage]
+            arguments = dict(arguments)
+            max_time = arguments.get("max_time")
+            part = None
+            if max_time != None and checkpoint_interval != None:
+                part = min(checkpoint_interval, max_time - spent)
+                arguments["max_time"] = part
+                if spent == 0:
+                    self.rng = np.random.default_rng(arguments.get("seed"))
+                    self.temperature = None
+                if "seed" in arguments: arguments["seed"] = int(self.rng.integers(2**32))
+                 # continue the temperature schedule of the previous part
+                if self.temperature != None and self.score > 0 and "temperature_init_mul" in signature(getattr(self, name)).parameters:
+                    arguments["temperature_init_mul"] = self.temperature / self.score
+            self.print_time("started stage {} ({})".format(stage, name))
+            start = time()
+            getattr(self, name)(**arguments)
+            spent += time() - start
+             # a part that ended early means the optimiser can't improve anymore
+            if part == None or spent >= max_time or time() - start < part: stage, spent = stage + 1, 0
+            self.resume = (stage, spent)
+            if checkpoint != None: self.save_checkpoint(checkpoint, self.resume)
+        self.resume = (0, 0)
+    
+    def print_time(self, msg = ""): 
+        if self.verbose: print(msg + "   --- %s seconds ---" % (time() - self.start_time))
+    
+    
+    def clock(self):
+        """
+        Function that returns the time for the telemetry, or None if there is no telemetry.
+        """
+        if self.telemetry != None: return perf_counter()
+    
+    def lap(self, optimiser, name, since):
+        """
+        Function that adds the time since since to a timer of the telemetry and returns the current time.
+        """
+        if self.telemetry != None: return self.telemetry.lap(optimiser, name, since)
+    
+    def count(self, optimiser, name, amount = 1):
+        """
+        Function that adds amount to a counter of the telemetry.
+        """
+        if self.telemetry != None: self.telemetry.count(optimiser, name, amount)
+    
+    def sample(self, optimiser):
+        """
+        Function that stores the current score in the telemetry.
+        """
+        if self.telemetry != None: self.telemetry.sample(optimiser, self.score)
+    
+    def reject(self, optimiser, since, amount = 1):
+        """
+        Function that stores a search without a usable candidate in the telemetry and returns False.
+        """
+        if self.telemetry != None:
+            self.telemetry.lap(optimiser, "filtering", since)
+            self.telemetry.count(optimiser, "rejected", amount)
+        return False
+    
+    def accept(self, optimiser, since):
+        """
+        Function that stores an applied move that started at since in the telemetry.
+        """
+        if self.telemetry != None:
+            self.telemetry.lap(optimiser, "mutation", since)
+            self.telemetry.count(optimiser, "accepted")
+            self.telemetry.sample(optimiser, self.score)
+    
+    
+    def run_steps(self, steps):
+        """
+        Function that runs the generator of an optimiser until it ends and returns True if it has yielded an improvement.
+        """
+        improved = False
+        for score, move in steps: improved = True
+        return improved
+    
+    def find_profiles(self):
+        """
+        Function that groups the cottages into classes of cottages with the same "Max # Pers" and restrictions.
+
+        Returns
+        -------
+        profiles : pd.Series
+            Series with the cottage ID as index and the number of its class (profile) as value.
+        """
+        profiles = self.df_cottages.groupby(["Max # Pers"] + self.restrictionlist, sort = False).ngroup()
+        return pd.Series(profiles.values, index = self.df_cottages["ID"].values)
     
     
     def combine(self):
         """
         Function to retrieve a dataframe with all possible reservation-cottage combos.        
 
+        The compatibility, upgrade and fitness are calculated once per reservation and class of cottages
+        and then copied to every cottage of the class. This is done for self.block_size reservations
+        at a time, so only one block of incompatible pairs is in memory at once.
+
         Returns
         -------
+        class_combined : pd.Dataframe
+            Allowed combos of reservations and classes of cottages.
         combined : pd.Dataframe
             Cross product of cottages and reservations where only allowed combos are left.
         """
-        combined = pd.merge(self.df_reservations, self.df_cottages, how = "cross", suffixes = ("_res", "_cot"))
-        combined = combined[combined["Max # Pers"] >= combined["# Persons"]]
-        for restriction in self.restrictionlist:
-            combined = combined[combined["{}_res".format(restriction)] <= combined["{}_cot".format(restriction)]]
-        combined = combined[(combined["Cottage (Fixed)"] == 0).add(combined["Cottage (Fixed)"] == combined["ID_cot"])]
-        combined["upgrade"] = (combined["Class_cot"] - combined["Class_res"] + \
-                              combined["Max # Pers"] - combined["# Persons"] > 0).multiply(combined["Cottage (Fixed)"] == 0)
-        
-        combined["fitness"] = combined["Max # Pers"] - combined["# Persons"]
-        for restriction in self.restrictionlist:
-            combined["fitness"] = combined["fitness"].add(combined["{}_cot".format(restriction)] - combined["{}_res".format(restriction)])
-        combined["indexx"] = combined[["ID_res", "ID_cot"]].values.tolist()
-        combined["indexx"] = combined["indexx"].map(lambda IDs: self.IDs_to_index(IDs[0], IDs[1]))
+        class_blocks = list()
+        blocks = list()
+        for first in range(0, len(self.df_reservations), self.block_size):
+            class_block, block = self.combine_block(self.df_reservations.iloc[first:first + self.block_size])
+            class_blocks.append(class_block)
+            blocks.append(block)
+        class_combined = pd.concat(class_blocks, ignore_index = True)
+        combined = pd.concat(blocks)
+        combined["indexx"] = self.IDs_to_index(combined["ID_res"], combined["ID_cot"])
         combined = combined.set_index("indexx")
         combined["ID"] = combined.index
-        return combined
+        return class_combined, combined
+    
+    
+    def combine_block(self, reservations):
+        """
+        Function that returns the allowed combos of some reservations with all classes and all cottages.
+
+        Parameters
+        ----------
+        reservations : pd.DataFrame
+            Block of self.df_reservations.
+
+        Returns
+        -------
+        class_combined : pd.Dataframe
+            Allowed combos of the reservations and the classes of cottages.
+        combined : pd.Dataframe
+            Cross product of the cottages and the reservations where only allowed combos are left.
+        """
+        profile_columns = ["Max # Pers"] + self.restrictionlist
+        reservation_names = {column: column + "_res" for column in reservations.columns if column in self.df_cottages.columns}
+        cottage_names = {column: column + "_cot" for column in self.df_cottages.columns if column in reservations.columns}
+        cottages = self.df_cottages.assign(profile = self.cottage_profiles.values, position = range(len(self.df_cottages)))
+        profiles = cottages.drop_duplicates("profile")[profile_columns + ["profile"]].rename(columns = cottage_names)
+        reservations = reservations.rename(columns = reservation_names)
+        
+        class_combined = pd.merge(reservations.assign(order = range(len(reservations))), profiles, how = "cross")
+        allowed = class_combined["Max # Pers"] >= class_combined["# Persons"]
+        for restriction in self.restrictionlist:
+            allowed = allowed.multiply(class_combined["{}_res".format(restriction)] <= class_combined["{}_cot".format(restriction)])
+        class_combined = class_combined[allowed]
+        class_combined["upgrade"] = (class_combined["Class_cot"] - class_combined["Class_res"] + \
+                                    class_combined["Max # Pers"] - class_combined["# Persons"] > 0).multiply(class_combined["Cottage (Fixed)"] == 0)
+        class_combined["fitness"] = class_combined["Max # Pers"] - class_combined["# Persons"]
+        for restriction in self.restrictionlist:
+            class_combined["fitness"] = class_combined["fitness"].add(class_combined["{}_cot".format(restriction)] - class_combined["{}_res".format(restriction)])
+        
+         # copy every class combo to the cottages of the class, in the order of the cottages
+        members = cottages.drop(columns = profile_columns).rename(columns = cottage_names)
+        combined = pd.merge(class_combined, members, on = "profile")
+        combined = combined[(combined["Cottage (Fixed)"] == 0).add(combined["Cottage (Fixed)"] == combined["ID_cot"])]
+        combined = combined.iloc[np.lexsort((combined["position"].to_numpy(), combined["order"].to_numpy()))]
+        columns = list(reservations.columns) + list(self.df_cottages.rename(columns = cottage_names).columns) + ["profile", "upgrade", "fitness"]
+        return class_combined.drop(columns = ["order"]), combined[columns]
     
     
     def IDs_to_index(self, reservationID, cottageID):
-        reservation_str = str(reservationID)
-        cottage_str     = str(cottageID)
-        reservation_str = "0" * (self.reservation_digits - len(reservation_str)) + reservation_str
-        cottage_str     = "0" * (self.cottage_digits     - len(cottage_str))   + cottage_str
-        return reservation_str + cottage_str
+        """
+        Function that combines reservation and cottage IDs into the integer index of the combinations. Also works on Series.
+        The index is calculated in int64, the IDs from Loader are int32 and their product can be too large for that.
+        """
+        if isinstance(reservationID, pd.Series): return reservationID.astype(np.int64) * self.cottage_stride + cottageID.astype(np.int64)
+        return int(reservationID) * self.cottage_stride + int(cottageID)
+    
+    def reservation_option(self, ID_res, cottage_ID):
+        """
+        Function that looks up how a reservation would be stored in a cottage.
+
+        Parameters
+        ----------
+        ID_res : INT
+            ID of the reservation.
+        cottage_ID : INT
+            ID of the cottage.
+
+        Returns
+        -------
+        ((ID_res, BOOL), INT, INT) or None
+            The reservation tuple, arrival day and length of stay, or None if the reservation is not allowed in the cottage.
+
+        """
+        position = self.candidate_index.position(ID_res, cottage_ID)
+        if position < 0: return None
+        index = self.candidate_index
+        return (index.ID_res[position], index.upgrade[position]), index.day[position], index.length[position]
     
     
     def assign_cottages(self):
@@ -89,19 +361,27 @@ class Planner():
         Function that assigns reservations to the cottages. There is no failsafe yes.
         It assigns the reservation with the least possible cottages first and chooses 
         the cottage based on whether it is considered an upgrade and the fitness score.
+        Classes with the same upgrade and fitness are tried together, in the order of their cottages.
         """
         self.print_time("started assigning cottages")
         order = self.combinations.groupby("ID_res")["ID"].count().sort_values().index.tolist()
+        cottage_positions = {ID: position for position, ID in enumerate(self.cottages)}
+        index = self.candidate_index
         for reservation_ID in order:
-            cottages = self.combinations[self.combinations["ID_res"] == reservation_ID]
-            cottages = cottages.sort_values(by = ["upgrade", "fitness"])[["ID_cot", "ID_res", "day", "Length of Stay", "upgrade"]]
+            positions, boundaries = index.ranked_classes(reservation_ID)
             assigned = False
-            for index, row in cottages.iterrows():
-                cottage = self.cottages[row["ID_cot"]]
-                if cottage.allowed_reservation((row["ID_res"], row["upgrade"]), row["day"], row["Length of Stay"]):
-                    cottage.add_reservation((row["ID_res"], row["upgrade"]), row["day"], row["Length of Stay"])
-                    assigned = True
-                    break
+            for group in np.split(positions, boundaries):
+                first = group[0]
+                reservation = (index.class_ID_res[first], index.class_upgrade[first])
+                day, length = index.class_day[first], index.class_length[first]
+                if index.class_fixed[first] != 0: cottage_IDs = [index.class_fixed[first]]
+                else: cottage_IDs = sorted([ID for profile in index.class_profile[group] for ID in self.profiles[profile]], key = cottage_positions.get)
+                for cottage_ID in cottage_IDs:
+                    if self.cottages[cottage_ID].allowed_reservation(reservation, day, length):
+                        self.add_assignment(cottage_ID, reservation, day, length)
+                        assigned = True
+                        break
+                if assigned: break
             if not assigned: print("couldn't assign reservation {}".format(reservation_ID))
         self.print_time("ended assigning cottages")
 
@@ -125,18 +405,14 @@ class Planner():
             boolean that describes if the cottages should be emptied first. The default is False.
         """
         self.print_time("started reading assignments")
-        combinations = self.combinations
         if remove:
-            for cottage in self.cottages.values():
-                for reservation in cottage.reservations:
-                    cottage.remove_reservation(reservation)
+            for ID_res in list(self.assignment_index): self.remove_assignment(ID_res)
         for reservation, cottage in assignments.items():
-            index = self.IDs_to_index(reservation, cottage)
-            if index not in combinations.index:
+            option = self.reservation_option(reservation, cottage)
+            if option == None:
                 print("reservation {} with cottage {} is not allowed".format(reservation, cottage))
                 return
-            combination = combinations.loc[index].squeeze()
-            self.cottages[cottage].add_reservation((combination["ID_res"], combination["upgrade"]), combination["day"], combination["Length of Stay"])
+            self.add_assignment(cottage, *option)
         self.print_time("ended reading assignments")
     
     def reservation_assignments(self):
@@ -144,43 +420,146 @@ class Planner():
         Function that returns a dataframe with the reservations as index and the cottage number they are assigned to.
         """
         assignments = dict()
-        for cottage in self.cottages.values():
-            ID = cottage.ID
-            for reservation in cottage.reservations: assignments[reservation[0]] = ID
-        return pd.Series(data = assignments).sort_index()
+        for ID_res, assignment in self.assignment_index.items(): assignments[ID_res] = assignment[0]
+        return pd.Series(data = assignments, dtype = "int64").sort_index()
+    
+    def add_assignment(self, cottage_ID, reservation, start_day, days):
+        """
+        Function that adds a reservation to a cottage and to the assignment index.
+
+        Parameters
+        ----------
+        cottage_ID : INT
+            ID of the cottage the reservation is added to.
+        reservation : (ID_res, BOOL)
+            Tuple that stores the reservation ID and wheter or not this is an upgrade.
+        start_day : INT
+            Integer with the arrival day for the reservation.
+        days : INT
+            Days the reservation lasts.
+
+        Returns
+        -------
+        BOOL
+            Variable that indicates if the reservation is added.
+
+        """
+        cottage = self.cottages[cottage_ID]
+        if not cottage.allowed_reservation(reservation, start_day, days):
+            print("!!! reservationspace not free")
+            return False
+        cottage.add_reservation(reservation, start_day, days)
+        self.assignment_index[reservation[0]] = (cottage_ID, start_day, start_day + days - 1, reservation[1])
+        self.slots.add(cottage_ID, start_day, start_day + days - 1)
+        return True
+    
+    def remove_assignment(self, ID_res):
+        """
+        Function that removes a reservation from its cottage and from the assignment index.
+
+        Parameters
+        ----------
+        ID_res : INT
+            ID of the reservation that will be removed.
+
+        Returns
+        -------
+        (cottage_ID : INT, start_day : INT, end_day : INT, upgrade : BOOL)
+            The assignment the reservation had.
+
+        """
+        assignment = self.assignment_index.pop(ID_res)
+        self.cottages[assignment[0]].remove_reservation((ID_res, assignment[3]))
+        self.slots.remove(assignment[0], assignment[1])
+        return assignment
+    
+    def assigned_cottage(self, ID_res):
+        """
+        Function that returns the cottage a reservation is assigned to, or None if it is not assigned.
+        """
+        if ID_res in self.assignment_index: return self.assignment_index[ID_res][0]
+    
+    def assigned_in(self, options, cottage_IDs):
+        """
+        Function that filters for reservations that are assigned to one of the cottages.
+
+        Parameters
+        ----------
+        options : pd.DataFrame
+            DataFrame with reservations.
+        cottage_IDs : pd.Series
+            IDs of the allowed cottages.
+
+        Returns
+        -------
+        options : pd.DataFrame
+            filtered DataFrame where only rows with reservations in one of the cottages are left.
+
+        """
+        if options.empty: return options
+        return options[options["ID_res"].map(self.assigned_cottage).isin(cottage_IDs)]
     
-    def store_excel(self, filename, sheetname):
+    def store_excel(self, filename, sheetname, retries = 3, delay = 1):
         """
-        Function that stores the assigned cottage of a reservation in Excel.
+        Function that stores the assigned cottage of a reservation in the second column of a sheet in Excel.
+        If the file can't be opened or saved (for example because it is opened in Excel) it tries again
+        after delay, 2 * delay, 4 * delay, ... seconds and raises the error after the last try.
+
+        Parameters
+        ----------
+        filename : STR
+            Filename of the workbook.
+        sheetname : STR
+            Name of the sheet.
+        retries : INT, optional
+            Amount of extra tries. The default is 3.
+        delay : FLOAT, optional
+            Seconds before the first extra try. The default is 1.
         """
-        repeat = True
-        while repeat:
-            try: 
+        self.print_time("started writing in excel")
+        cottages = self.reservation_assignments().values.tolist()
+        for attempt in range(retries + 1):
+            try:
                 workbook = openpyxl.load_workbook(filename = filename)
+                worksheet = workbook[sheetname]
+                for row, cottage in zip(worksheet.iter_rows(min_row = 2, max_row = len(cottages) + 1, min_col = 2, max_col = 2), cottages):
+                    row[0].value = cottage
                 workbook.save(filename)
                 workbook.close()
-                repeat = False
-            except:
-                answer = input("Python can't open {}.\nIf the file is opened please close it\nDo you want to try again? (y/n)".format(filename))
-                if answer != "y": return
-        self.print_time("started writing in excel")
-        workbook = openpyxl.load_workbook(filename = filename)
-        worksheet = workbook[sheetname]
-        for i, cottage in enumerate(self.reservation_assignments().values.tolist(), start = 2):
-            worksheet.cell(row = i, column = 2).value = cottage
-        workbook.save(filename)
-        workbook.close()
+                break
+            except OSError as error:
+                if attempt == retries: raise
+                print("!!! can't write {} ({}), trying again in {} seconds".format(filename, error, delay * 2 ** attempt))
+                sleep(delay * 2 ** attempt)
         self.print_time("ended writing in excel")
     
+    def store_assignments(self, filename):
+        """
+        Function that stores the assigned cottage of every reservation without Excel.
+        The format depends on the extension of filename: .csv, .parquet (needs pyarrow) or .json.
+        """
+        assignments = self.reservation_assignments().rename("Cottage").rename_axis("ID").reset_index()
+        if filename.endswith(".csv"): assignments.to_csv(filename, index = False)
+        elif filename.endswith(".parquet"): assignments.to_parquet(filename, index = False)
+        elif filename.endswith(".json"): assignments.to_json(filename, orient = "records")
+        else: print("!!! unknown file type of {}, use .csv, .parquet or .json".format(filename))
+    
     def assign_improvements_best(self):
         """
         Function that tries to find the best switch for each cottage and applies them. (Very slow)
         """
+        return self.run_steps(self.assign_improvements_best_steps(Deadline()))
+    
+    def assign_improvements_best_steps(self, deadline):
+        """
+        Function that runs assign_improvements_best as a generator that yields (score, move) after every switch.
+        It stops at the next cottage when deadline expires.
+        """
         self.print_time("started improving assignments with a score of {}".format(self.score))
+        telemetry = self.telemetry
         itteration = 0
         improved = True
         while improved:
-            assignments = self.reservation_assignments()
             cottageIDs = list()
             cottagescores = list()
             for cottage in self.cottages.values():
@@ -188,28 +567,35 @@ class Planner():
                 cottagescores.append(cottage.score)
             order = pd.Series(cottagescores, index = cottageIDs).sort_values(ascending = False).index.tolist()
             for cottage_ID in order:
+                if deadline.expired(): 
+                    self.print_time("ended improving assignments with a score of {}".format(self.score)) 
+                    return
                 best = (0, 0)
-                options_cot = self.combinations[self.combinations["ID_cot"] == cottage_ID]
                 for gap in self.cottages[cottage_ID].get_gaps():
                     improved = False
-                    options = options_cot[options_cot["day"] == gap[1]]
-                    options = options[options["final_day"] == gap[2]]
-                                   
+                    if telemetry != None: clock = perf_counter()
+                    options = self.combinations.iloc[self.candidate_index.cottage_day_final(cottage_ID, gap[1], gap[2])]
+                    if telemetry != None:
+                        clock = telemetry.lap("assign_improvements_best", "filtering", clock)
+                        telemetry.count("assign_improvements_best", "candidates", len(options))
                     for index, row in options.iterrows():
-                        startscore = self.cottages[assignments[row["ID_res"]]].score + \
-                                     self.cottages[cottage_ID].score
-                        old_cottage_ID = assignments.loc[row["ID_res"]]
-                        if not self.switch_cottage(row["ID_res"], cottage_ID): print("error while switching cottages")
-                        endscore = self.cottages[old_cottage_ID].score + self.cottages[cottage_ID].score
-                        if not self.switch_cottage(row["ID_res"], old_cottage_ID): print("error while switching back cottages")
-                        score = startscore - endscore
+                        feasible, delta = self.evaluate_switch(row["ID_res"], cottage_ID)
+                        if telemetry != None:
+                            telemetry.count("assign_improvements_best", "evaluated")
+                            if not feasible: telemetry.count("assign_improvements_best", "rejected")
+                        if not feasible: continue
+                        score = -delta
                         if score > best[1]:
                             best = (row["ID_res"], score)
                             improved = True
+                    if telemetry != None: telemetry.lap("assign_improvements_best", "scoring", clock)
                 if improved:
+                    if telemetry != None: clock = perf_counter()
                     if not self.switch_cottage(best[0], cottage_ID): print("error while switching cottages")
+                    if telemetry != None: self.accept("assign_improvements_best", clock)
                     itteration += 1
                     if itteration % 10 == 0: self.print_time("iteration {} with score {}".format(itteration, self.score))
+                    yield self.score, ("switch", best[0], cottage_ID)
         self.print_time("ended improving assignments with a score of {}".format(self.score)) 
     
     def assign_improvements_any(self, max_time = 300):
@@ -221,14 +607,19 @@ class Planner():
         max_time : INT, optional
             Sets the maximum amount of seconds the function is allowed to run.. The default is 300.
         """
+        return self.run_steps(self.assign_improvements_any_steps(Deadline(max_time)))
+    
+    def assign_improvements_any_steps(self, deadline):
+        """
+        Function that runs assign_improvements_any as a generator that yields (score, move) after every switch until deadline expires.
+        """
         self.print_time("started improving assignments with a score of {}".format(self.score))
+        telemetry = self.telemetry
         count = 0
         improved = True
-        runtime = time()
         repeat_after = 5
-        while time() - runtime < max_time:
+        while not deadline.expired():
             improved = False
-            assignments = self.reservation_assignments()
             cottageIDs = list()
             cottagescores = list()
             for cottage in self.cottages.values():
@@ -236,28 +627,26 @@ class Planner():
                 cottagescores.append(cottage.score)
             order = pd.Series(cottagescores, index = cottageIDs).sort_values(ascending = False).index.tolist()
             for i, cottage_ID in enumerate(order):
-                reservations = self.combinations[self.combinations["ID_cot"] == cottage_ID]
+                if telemetry != None: clock = perf_counter()
+                reservations = self.combinations.iloc[self.candidate_index.cottage(cottage_ID)]
+                if telemetry != None:
+                    clock = telemetry.lap("assign_improvements_any", "filtering", clock)
+                    telemetry.count("assign_improvements_any", "candidates", len(reservations))
                 for index, row in reservations.iterrows():
-                    skip = False
-                    for reservation in self.cottages[cottage_ID].reservations: 
-                        if row["ID_res"] == reservation[0]: 
-                            skip = True
-                            break
-                    if skip: continue
-                    startscore = self.cottages[assignments.loc[row["ID_res"]]].score + \
-                                 self.cottages[cottage_ID].score
-                    if self.cottages[cottage_ID].allowed_reservation((row["ID_res"], row["upgrade"]), row["day"], row["Length of Stay"]):
-                        old_cottage_ID = assignments.loc[row["ID_res"]]
+                    feasible, delta = self.evaluate_switch(row["ID_res"], cottage_ID)
+                    if telemetry != None:
+                        clock = telemetry.lap("assign_improvements_any", "scoring", clock)
+                        telemetry.count("assign_improvements_any", "evaluated")
+                        if not feasible: telemetry.count("assign_improvements_any", "rejected")
+                    if feasible and delta < 0:
                         if not self.switch_cottage(row["ID_res"], cottage_ID): print("error while switching cottages")
-                        endscore = self.cottages[old_cottage_ID].score + self.cottages[cottage_ID].score
-                        score = startscore - endscore
-                        if score <= 0:
-                            if not self.switch_cottage(row["ID_res"], old_cottage_ID): print("error while switching back cottages")
-                        else:
-                            improved = True
-                            count += 1
-                            assignments.loc[row["ID_res"]] = cottage_ID
-                            if count % 10 == 0: self.print_time("iteratiion {} with score {}".format(count, self.score))
+                        if telemetry != None:
+                            self.accept("assign_improvements_any", clock)
+                            clock = perf_counter()
+                        improved = True
+                        count += 1
+                        if count % 10 == 0: self.print_time("iteratiion {} with score {}".format(count, self.score))
+                        yield self.score, ("switch", row["ID_res"], cottage_ID)
                 if i >= repeat_after:
                     if not improved: repeat_after += 1
                     else: break
@@ -278,55 +667,331 @@ class Planner():
             multiplier of the temperature after each repeat. The default is 0.5.
         temperature_repeat : INT, optional
             amount of itterations before the temperature is reduced. The default is 10.
+
+        Returns
+        -------
+        BOOL
+            True if a better planning has been found.
+        """
+        return self.run_steps(self.assign_improvements_simulated_steps(Deadline(max_time), temperature_init_mul, temperature_mul, temperature_repeat))
+    
+    def assign_improvements_simulated_steps(self, deadline, temperature_init_mul = 0.0001, temperature_mul = 0.5, temperature_repeat = 100):
+        """
+        Function that runs assign_improvements_simulated as a generator that yields (score, move) every time a better planning is found,
+        with the switch that led to it. When deadline expires or the generator is closed the planner goes back to the best planning.
         """
         self.print_time("started improving assignments with a score of {}".format(self.score))
         temperature = self.score * temperature_init_mul
-        runtime = time()
-        assignments_combo = [self.reservation_assignments(), self.score]
-        best_assignment_combo = (assignments_combo[0].copy(), self.score)
-        combinations = self.combinations[self.combinations["Cottage (Fixed)"] == 0]
+        current_score = self.score
+        best_assignment_combo = (self.reservation_assignments(), current_score)
+        telemetry = self.telemetry
         itteration = 0
-        has_improved = False
-        while True:
-            if time() - runtime > max_time:
-                self.read_assignements(best_assignment_combo[0], remove = True)
-                self.print_time("ended improving assignments with a score of {}".format(self.score))
-                return has_improved
-            gap = None
-            while True:
-                cottage = choice(list(self.cottages.values()))
-                gap_count = cottage.gaps
-                if gap_count > 0:
-                    gap = cottage.get_gap(randint(1, gap_count))
-                    if gap != None: break
-            options = combinations
-            options = options[options["ID_cot"] == cottage.ID]
-            options = options[options["day"] == gap[1]]
-            options = options[options["final_day"] == gap[2]]
-            options = options.sample(min(10, len(options)))
-            if options.empty: continue
-            while not options.empty:
-                success = False
-                sample = options.sample()
-                sample_series = sample.squeeze()
-                old_cottage_ID = assignments_combo[0][sample_series["ID_res"]]
-                startscore = cottage.score + self.cottages[old_cottage_ID].score
-                if not self.switch_cottage(sample_series["ID_res"], cottage.ID): print("error while switching cottages")
-                end_score = cottage.score + self.cottages[old_cottage_ID].score
-                score = startscore - end_score
-                if score < 0: success = random() < exp(score / temperature)
-                else: success = True
-                if success: 
-                    assignments_combo[0].loc[sample_series["ID_res"]] = cottage.ID
-                    assignments_combo[1] += score
-                    if assignments_combo[1] > best_assignment_combo[1]: best_assignment_combo = (assignments_combo[0].copy(), self.score)
-                    itteration += 1
-                    if itteration % 100 == 0: self.print_time("iteration {} with score {}".format(itteration, self.score))
-                    if itteration % temperature_repeat == 0: temperature *= temperature_mul
-                    break
-                if not self.switch_cottage(sample_series["ID_res"], old_cottage_ID): print("error while switching back cottages")
-                options = options.drop(sample.index)
-                
+        try:
+            while not deadline.expired():
+                gap = None
+                while gap == None:
+                     # stop when the time is over or no cottage has a gap left, so the caller gets control back
+                    if deadline.expired(): return
+                    gap_cottages = [cottage for cottage in self.cottages.values() if cottage.gaps > 0]
+                    if len(gap_cottages) == 0: return
+                    cottage = choice(gap_cottages)
+                    gap = cottage.get_gap(randint(1, cottage.gaps))
+                if telemetry != None: clock = perf_counter()
+                options = self.combinations.iloc[self.candidate_index.cottage_day_final(cottage.ID, gap[1], gap[2])]
+                options = options[options["Cottage (Fixed)"] == 0]
+                options = options.sample(min(10, len(options)))
+                if telemetry != None:
+                    clock = telemetry.lap("assign_improvements_simulated", "filtering", clock)
+                    telemetry.count("assign_improvements_simulated", "candidates", len(options))
+                if options.empty: continue
+                while not options.empty:
+                    success = False
+                    sample = options.sample()
+                    sample_series = sample.squeeze()
+                    feasible, delta = self.evaluate_switch(sample_series["ID_res"], cottage.ID)
+                    if telemetry != None:
+                        clock = telemetry.lap("assign_improvements_simulated", "scoring", clock)
+                        telemetry.count("assign_improvements_simulated", "evaluated")
+                        if not feasible: telemetry.count("assign_improvements_simulated", "rejected")
+                    score = -delta
+                    if not feasible: success = False
+                    elif score < 0: success = random() < exp(score / temperature)
+                    else: success = True
+                    if success: 
+                        if not self.switch_cottage(sample_series["ID_res"], cottage.ID): print("error while switching cottages")
+                        if telemetry != None: self.accept("assign_improvements_simulated", clock)
+                        current_score -= score
+                        itteration += 1
+                        if itteration % 100 == 0: self.print_time("iteration {} with score {}".format(itteration, self.score))
+                        if itteration % temperature_repeat == 0: temperature *= temperature_mul
+                        if current_score < best_assignment_combo[1]: 
+                            best_assignment_combo = (self.reservation_assignments(), current_score)
+                            yield current_score, ("switch", sample_series["ID_res"], cottage.ID)
+                        break
+                    options = options.drop(sample.index)
+        finally:
+            self.temperature = temperature
+            self.read_assignements(best_assignment_combo[0], remove = True)
+            self.print_time("ended improving assignments with a score of {}".format(self.score))
+    
+    def assign_improvements_annealing(self, max_time = 300, temperature_init_mul = 0.0001, temperature_mul = 0.5, temperature_repeat = 100, seed = None, max_moves = None):
+        """
+        Function that uses simulated annealing on integer lists to try and find a better score (fast).
+        A move puts a reservation in any other cottage it fits in.
+
+        Parameters
+        ----------
+        max_time : INT, optional
+            Sets the maximum amount of seconds the function is allowed to run. The default is 300.
+        temperature_init_mul : FLOAT, optional
+            multiplier of the first score to create initial temperature. The default is 0.0001.
+        temperature_mul : FLOAT, optional
+            multiplier of the temperature after each repeat. The default is 0.5.
+        temperature_repeat : INT, optional
+            amount of accepted moves before the temperature is reduced. The default is 100.
+        seed : INT, optional
+            Seed of the random generator. The default is None.
+        max_moves : INT, optional
+            Maximum amount of moves that are tried. The default is None.
+
+        Returns
+        -------
+        BOOL
+            True if the score has improved.
+
+        """
+        return self.run_steps(self.assign_improvements_annealing_steps(Deadline(max_time), temperature_init_mul, temperature_mul, \
+                                                                       temperature_repeat, seed, max_moves))
+    
+    def assign_improvements_annealing_steps(self, deadline, temperature_init_mul = 0.0001, temperature_mul = 0.5, temperature_repeat = 100, \
+                                            seed = None, max_moves = None):
+        """
+        Function that runs assign_improvements_annealing as a generator that yields (score, move) after every temperature that found
+        a better planning. The move is ("annealing", accepted moves), before every yield the planner is moved to the best planning,
+        so it has the score that is yielded.
+        """
+        self.print_time("started annealing assignments with a score of {}".format(self.score))
+        annealer = Annealer(self)
+        clock = self.clock()
+        steps = annealer.steps(deadline, temperature_init_mul, temperature_mul, temperature_repeat, seed, max_moves)
+        try:
+            for best_score in steps:
+                annealer.apply_best(self)
+                yield best_score, ("annealing", annealer.stats["accepted"])
+        finally:
+            steps.close()
+            self.temperature = annealer.temperature
+            stats = annealer.stats
+            clock = self.lap("assign_improvements_annealing", "scoring", clock)
+            annealer.apply(self)
+            self.lap("assign_improvements_annealing", "mutation", clock)
+            self.count("assign_improvements_annealing", "evaluated", stats["moves"])
+            self.count("assign_improvements_annealing", "accepted", stats["accepted"])
+            self.sample("assign_improvements_annealing")
+            self.print_time("tried {} moves ({:.0f} per second), accepted {}".format(stats["moves"], stats["moves_per_second"], stats["accepted"]))
+            self.print_time("ended annealing assignments with a score of {}".format(self.score))
+    
+    def assign_improvements_multistart(self, runs = 8, processes = None, max_time = 300, temperature_init_mul = 0.0001, temperature_mul = 0.5, \
+                                       temperature_repeat = 100, seed = None, max_moves = None, schedules = None):
+        """
+        Function that starts independent annealing runs from the current assignment in a pool of processes
+        and keeps the best result. The planning is sent once to every process as an Annealer,
+        so the processes don't need the DataFrames or the cottages.
+
+        Parameters
+        ----------
+        runs : INT, optional
+            Amount of annealing runs. The default is 8.
+        processes : INT, optional
+            Amount of processes, None uses all cores. The default is None.
+        max_time : INT, optional
+            Sets the maximum amount of seconds a run is allowed to take. The default is 300.
+        temperature_init_mul : FLOAT, optional
+            multiplier of the first score to create initial temperature. The default is 0.0001.
+        temperature_mul : FLOAT, optional
+            multiplier of the temperature after each repeat. The default is 0.5.
+        temperature_repeat : INT, optional
+            amount of accepted moves before the temperature is reduced. The default is 100.
+        seed : INT, optional
+            Seed from which the seeds of the runs are made. The default is None.
+        max_moves : INT, optional
+            Maximum amount of moves that are tried per run. The default is None.
+        schedules : list, optional
+            list with a (temperature_init_mul, temperature_mul, temperature_repeat) tuple for every run, 
+            None gives every run the same schedule. The default is None.
+
+        Returns
+        -------
+        assignments : pd.Series
+            Series with reservation_ID as index and cottage number as value of the best run.
+        stats : pd.DataFrame
+            DataFrame with the schedule, score, moves and seconds of every run.
+
+        """
+        self.print_time("started {} annealing runs with a score of {}".format(runs, self.score))
+        annealer = Annealer(self)
+        if schedules == None: schedules = [(temperature_init_mul, temperature_mul, temperature_repeat)] * runs
+        seeds = np.random.SeedSequence(seed).spawn(runs)
+        settings = [{"max_time": max_time, "temperature_init_mul": schedule[0], "temperature_mul": schedule[1], \
+                     "temperature_repeat": schedule[2], "seed": run_seed, "max_moves": max_moves} \
+                    for schedule, run_seed in zip(schedules, seeds)]
+        with ProcessPoolExecutor(max_workers = processes, initializer = init_worker, initargs = (annealer,)) as pool:
+            results = list(pool.map(run_worker, settings))
+        stats = pd.DataFrame([result[0] for result in results])
+        stats.insert(0, "temperature_init_mul", [schedule[0] for schedule in schedules])
+        stats.insert(1, "temperature_mul", [schedule[1] for schedule in schedules])
+        stats.insert(2, "temperature_repeat", [schedule[2] for schedule in schedules])
+        best = int(stats["score"].idxmin())
+        if stats["score"][best] < self.score:
+            annealer.load(results[best][1], results[best][2], stats["score"][best])
+            annealer.apply(self)
+        self.print_time("best run {} of {} has a score of {}".format(best + 1, runs, stats["score"][best]))
+        self.print_time("ended annealing runs with a score of {}".format(self.score))
+        return self.reservation_assignments(), stats
+    
+    def assign_improvements_tempering(self, replicas = 4, max_time = 300, temperature_min_mul = 0.00001, temperature_max_mul = 0.001, \
+                                      exchange_moves = 10000, seed = None):
+        """
+        Function that uses parallel tempering: every replica anneals a copy of the assignment at its own fixed temperature 
+        in its own process, and after every exchange_moves moves neighbouring temperatures are swapped by the Metropolis criterion.
+
+        Parameters
+        ----------
+        replicas : INT, optional
+            Amount of replicas and processes. The default is 4.
+        max_time : INT, optional
+            Sets the maximum amount of seconds the function is allowed to run. The default is 300.
+        temperature_min_mul : FLOAT, optional
+            multiplier of the first score to create the lowest temperature. The default is 0.00001.
+        temperature_max_mul : FLOAT, optional
+            multiplier of the first score to create the highest temperature. The default is 0.001.
+        exchange_moves : INT, optional
+            Amount of moves every replica tries between two exchanges. The default is 10000.
+        seed : INT, optional
+            Seed from which the seeds of the replicas are made. The default is None.
+
+        Returns
+        -------
+        stats : pd.DataFrame
+            DataFrame with for every temperature but the highest the amount of tried and accepted exchanges 
+            with the next temperature and the acceptance rate.
+
+        """
+        self.print_time("started parallel tempering with a score of {}".format(self.score))
+        annealer = Annealer(self)
+        if replicas > 1: ratio = (temperature_max_mul / temperature_min_mul) ** (1 / (replicas - 1))
+        else: ratio = 1
+         # the temperatures must be positive, also when the score is 0 or negative
+        ladder = [max(abs(self.score), 1) * temperature_min_mul * ratio ** k for k in range(replicas)]
+        seeds = np.random.SeedSequence(seed).spawn(replicas + 1)
+        rng = np.random.default_rng(seeds[-1])
+        connections = list()
+        processes = list()
+        for replica in range(replicas):
+            connection, worker_connection = Pipe()
+            process = Process(target = replica_worker, args = (worker_connection, annealer, seeds[replica]), daemon = True)
+            process.start()
+            connections.append(connection)
+            processes.append(process)
+         # replica_at[k] is the replica that has temperature ladder[k]
+        replica_at = list(range(replicas))
+        tried = [0] * replicas
+        accepted = [0] * replicas
+        best_scores = [self.score] * replicas
+        moves = 0
+        exchange = 0
+        deadline = time() + max_time
+        while time() < deadline:
+            for k, replica in enumerate(replica_at): connections[replica].send(("walk", ladder[k], exchange_moves, deadline))
+            scores = list()
+            for replica, connection in enumerate(connections):
+                score, best_scores[replica], replica_moves, replica_accepted = connection.recv()
+                scores.append(score)
+                moves += replica_moves
+            for k in range(exchange % 2, replicas - 1, 2):
+                cold, hot = replica_at[k], replica_at[k + 1]
+                exponent = (scores[cold] - scores[hot]) * (1 / ladder[k] - 1 / ladder[k + 1])
+                tried[k] += 1
+                if exponent >= 0 or rng.random() < exp(exponent):
+                    replica_at[k], replica_at[k + 1] = hot, cold
+                    accepted[k] += 1
+            exchange += 1
+        best = int(np.argmin(best_scores))
+        connections[best].send(("best",))
+        rows, upgrades, score = connections[best].recv()
+        for connection in connections: connection.send(("stop",))
+        for process in processes: process.join()
+        if score < self.score:
+            annealer.load(rows, upgrades, score)
+            annealer.apply(self)
+        stats = pd.DataFrame({"temperature": ladder[:-1], "tried": tried[:-1], "accepted": accepted[:-1]})
+        stats["rate"] = stats["accepted"] / stats["tried"].where(stats["tried"] > 0)
+        for k in range(replicas - 1): 
+            self.print_time("exchanges at temperature {:.4f} accepted {} of {}".format(ladder[k], accepted[k], tried[k]))
+        self.print_time("tried {} moves in {} exchanges".format(moves, exchange))
+        self.print_time("ended parallel tempering with a score of {}".format(self.score))
+        return stats
+    
+    def adaptive_optimiser(self, max_time = 600, operators = adaptive_operators, slice_time = 10, reaction = 0.5):
+        """
+        Function that divides one time budget over several optimisers, the operators. Every operator is run for at most slice_time seconds
+        at a time and its improvement of the score per CPU-second is remembered. The next operator is drawn with a chance proportional
+        to this rate, so the operators that are improving the most get the most time. It stops when the time is up or when every operator
+        has been run since the last improvement without improving.
+
+        Parameters
+        ----------
+        max_time : INT, optional
+            Sets the maximum amount of seconds the function is allowed to run. The default is 600.
+        operators : dict, optional
+            dictionary with the names of the optimisers and their arguments besides max_time. The default is adaptive_operators.
+        slice_time : FLOAT, optional
+            Maximum amount of seconds of one run of an operator. The default is 10.
+        reaction : FLOAT, optional
+            Weight of the last run in the rate of an operator, the rest is the rate before it. The default is 0.5.
+
+        Returns
+        -------
+        stats : pd.DataFrame
+            DataFrame with for every operator the amount of runs, the CPU-seconds, the total improvement and the last rate.
+
+        """
+        self.print_time("started adaptive optimising with a score of {}".format(self.score))
+        deadline = Deadline(max_time)
+        rates = {name: inf for name in operators}
+        runs = {name: 0 for name in operators}
+        seconds = {name: 0 for name in operators}
+        improvements = {name: 0 for name in operators}
+         # operators that have been run since the last improvement
+        tried = set()
+        while not deadline.expired() and len(tried) < len(operators):
+            candidates = [name for name in operators if name not in tried]
+            untested = [name for name in candidates if rates[name] == inf]
+            if untested: name = untested[0]
+            else:
+                 # operators without improvements keep a small chance
+                floor = max(max(rates[name] for name in candidates), 1) * 0.01
+                name = choices(candidates, [max(rates[name], 0) + floor for name in candidates])[0]
+            part = min(slice_time, deadline.remaining())
+            start_score = self.score
+            start = time()
+            cpu = process_time()
+            self.run_steps(getattr(self, name + "_steps")(Deadline(part), **operators[name]))
+            cpu = process_time() - cpu
+            improvement = start_score - self.score
+            rate = improvement / max(cpu, 0.001)
+            rates[name] = rate if rates[name] == inf else reaction * rate + (1 - reaction) * rates[name]
+            runs[name] += 1
+            seconds[name] += cpu
+            improvements[name] += improvement
+            self.print_time("{} improved the score by {} in {:.2f} CPU-seconds".format(name, improvement, cpu))
+            if improvement <= 0: tried.add(name)
+             # an operator that ended before its time has nothing more to do until another operator changes the planning
+            elif time() - start < part: tried = {name}
+            else: tried = set()
+        stats = pd.DataFrame({"runs": runs, "seconds": seconds, "improvement": improvements, "rate": rates})
+        self.print_time("ended adaptive optimising with a score of {}".format(self.score))
+        return stats
     
     def gaps_legionella_optimiser_repeat(self, max_time = 600, gaps_1 = True, gaps_2 = True, gaps_3 = True, gaps_456 = True):
         """
@@ -337,15 +1002,24 @@ class Planner():
         max_time : INT, optional
             Sets the maximum amount of seconds the function is allowed to run. The default is 600.
         """
+        return self.run_steps(self.gaps_legionella_optimiser_repeat_steps(Deadline(max_time), gaps_1, gaps_2, gaps_3, gaps_456))
+    
+    def gaps_legionella_optimiser_repeat_steps(self, deadline, gaps_1 = True, gaps_2 = True, gaps_3 = True, gaps_456 = True):
+        """
+        Function that runs gaps_legionella_optimiser_repeat as a generator that yields (score, move) after every improvement.
+        Both optimisers share deadline.
+        """
         self.print_time("started repeating gaps and legionella with a score of {}".format(self.score))
-        runtime = time()
         while True:
-            self.gaps_optimiser(max_time = max_time + runtime - time(), gaps_1 = gaps_1, gaps_2 = gaps_2, gaps_3 = gaps_3, gaps_456 = gaps_456)
-            improved = self.legionella_optimiser(max_time = max_time + runtime - time())
+            yield from self.gaps_optimiser_steps(deadline, gaps_1, gaps_2, gaps_3, gaps_456)
+            improved = False
+            for step in self.legionella_optimiser_steps(deadline):
+                improved = True
+                yield step
             if not improved:
                 self.print_time("ended repeating gaps and legionella with a score of {}".format(self.score))
                 return
-            if time() - runtime > max_time:
+            if deadline.expired():
                 self.print_time("ended repeating gaps and legionella with a score of {}".format(self.score))
                 return
     
@@ -364,11 +1038,16 @@ class Planner():
         has_improved : BOOL
             variable that tracks if any imprvements have been made.
 
+        """
+        return self.run_steps(self.gaps_optimiser_steps(Deadline(max_time), gaps_1, gaps_2, gaps_3, gaps_456))
+    
+    def gaps_optimiser_steps(self, deadline, gaps_1 = True, gaps_2 = True, gaps_3 = True, gaps_456 = True):
+        """
+        Function that runs gaps_optimiser as a generator that yields (score, move) after every filled gap until deadline expires.
+        The move is the improvement that was used with the cottage and the gap, for example ("gaps_1", cottage_ID, gap_start, gap_end).
         """
         self.print_time("started improving gaps with a score of {}".format(self.score))
         itteration = 0
-        has_improved = False
-        runtime = time()
         improved = True
         while improved: # verschil tussen 1 run en meerdere is minimaal
             cottageIDs = list()
@@ -382,10 +1061,10 @@ class Planner():
                 gaps = self.cottages[cottage_ID].gaps
                 if gaps == 0: continue
                 if gaps_3: 
-                    new_itteration = self.find_gap_improvement_3_caller(gaps, cottage_ID, itteration)
-                    if new_itteration > itteration:
-                        itteration = new_itteration
-                        has_improved = True
+                    for step in self.find_gap_improvement_3_caller(gaps, cottage_ID):
+                        itteration += 1
+                        if itteration % 10 == 0: self.print_time("iteration {} with score {}".format(itteration, self.score))
+                        yield step
                 compressed = self.cottages[cottage_ID].compressed_days()
                 front_reservation = None
                 gap = None
@@ -398,31 +1077,175 @@ class Planner():
                         if gaps_456:
                             if self.find_gap_improvement_456(cottage_ID, filler[1], filler[2]):
                                 improved = True
-                                has_improved = True
                                 itteration += 1
                                 if itteration % 20 == 0: self.print_time("iteration {} with score {}".format(itteration, self.score))
+                                yield self.score, ("gaps_456", cottage_ID, filler[1], filler[2])
                         if gaps_1 and not improved and front_reservation != None:
                             if self.find_gap_improvement_1(cottage_ID, filler[1], filler[2], front_reservation):
                                 improved = True
-                                has_improved = True
                                 itteration += 1
                                 if itteration % 20 == 0: self.print_time("iteration {} with score {}".format(itteration, self.score))
+                                yield self.score, ("gaps_1", cottage_ID, filler[1], filler[2])
                     else:
                         front_reservation = filler
                         if gap != None:
                             if gaps_2 and not improved and last[0] == None:
                                 if self.find_gap_improvement_2(cottage_ID, gap[1], gap[2], filler):
                                     improved = True
-                                    has_improved = True
                                     itteration += 1
                                     if itteration % 20 == 0: self.print_time("iteration {} with score {}".format(itteration, self.score))
+                                    yield self.score, ("gaps_2", cottage_ID, gap[1], gap[2])
                         last = filler
-                if time() - runtime > max_time:
+                if deadline.expired():
                     self.print_time("ended improving gaps with a score of {}".format(self.score))
-                    return has_improved
+                    return
         self.print_time("ended improving gaps with a score of {}".format(self.score))
-        return has_improved
         
+    def gaps_optimiser_parallel(self, max_time = 300, processes = None, gaps_1 = True, gaps_2 = True, gaps_3 = True, gaps_456 = True):
+        """
+        Function that runs gaps_optimiser on parts of the park at the same time in a pool of processes.
+        The parts are the groups of cottage_groups when there are enough of them. They have no allowed reservations in common,
+        so every move of the serial pass stays inside one group. Otherwise the days are split with time_windows and every
+        process only moves the reservations of its own window, which only changes and looks at days inside that window.
+        Either way the results of the parts can be merged without checks. A reservation on the edge of two windows is not moved,
+        the serial gaps_optimiser can still fill the gaps around it.
+
+        Parameters
+        ----------
+        max_time : INT, optional
+            Sets the maximum amount of seconds every part is allowed to run. The default is 300.
+        processes : INT, optional
+            Amount of processes, None uses all cores. With one process the serial gaps_optimiser is used. The default is None.
+
+        Returns
+        -------
+        has_improved : BOOL
+            variable that tracks if any imprvements have been made.
+
+        """
+        settings = {"max_time": max_time, "gaps_1": gaps_1, "gaps_2": gaps_2, "gaps_3": gaps_3, "gaps_456": gaps_456}
+        if processes == None: processes = os.cpu_count()
+        if processes == 1: return self.gaps_optimiser(**settings)
+        self.print_time("started improving gaps in parallel with a score of {}".format(self.score))
+        start_score = self.score
+         # groups without gaps or without reservations can't be improved
+        groups = [group for group in self.cottage_groups() if any(self.cottages[ID].gaps > 0 for ID in group) \
+                  and any(len(self.cottages[ID].stays) > 0 for ID in group)]
+        if len(groups) >= processes:
+            self.print_time("split the cottages into {} groups".format(len(groups)))
+            planners = [self.group_planner(group) for group in groups]
+        else:
+            windows = [window for window in self.time_windows(processes) if len(window) > 0]
+            self.print_time("split the days into {} windows with {} of the {} reservations".format(len(windows), \
+                            sum(len(window) for window in windows), len(self.df_reservations)))
+            planners = [self.group_planner(list(self.cottages), window) for window in windows]
+        with ProcessPoolExecutor(max_workers = processes) as pool:
+            results = list(pool.map(optimise_gaps_group, planners, [settings] * len(planners)))
+        for assignments in results: self.merge_assignments(assignments)
+        self.print_time("ended improving gaps in parallel with a score of {}".format(self.score))
+        return self.score < start_score
+    
+    def cottage_groups(self):
+        """
+        Function that splits the cottages into groups where no reservation is allowed in cottages of two groups
+        (the connected components of cottages that share an allowed reservation).
+
+        Returns
+        -------
+        groups : list
+            list with a list of cottage IDs for every group, the largest group first.
+
+        """
+        ID_res = self.candidate_index.ID_res
+        ID_cot = self.candidate_index.ID_cot
+        labels = np.arange(self.cottage_stride)
+        while True:
+            reservation_labels = np.full(ID_res.max() + 1, self.cottage_stride)
+            np.minimum.at(reservation_labels, ID_res, labels[ID_cot])
+            new_labels = labels.copy()
+            np.minimum.at(new_labels, ID_cot, reservation_labels[ID_res])
+            new_labels = new_labels[new_labels]
+            if (new_labels == labels).all(): break
+            labels = new_labels
+        groups = dict()
+        for ID in self.cottages: groups.setdefault(labels[ID], list()).append(ID)
+        return sorted(groups.values(), key = len, reverse = True)
+    
+    def time_windows(self, count):
+        """
+        Function that splits the days into count windows with about the same amount of arrivals.
+        A reservation belongs to a window when the day before it, its own days and the day after it all lie inside the window,
+        so the moves of gaps_optimiser with the reservations of different windows never look at the same days.
+        Reservations that cross the edge of a window are in no window.
+
+        Parameters
+        ----------
+        count : INT
+            Amount of windows.
+
+        Returns
+        -------
+        windows : list
+            list with a list of reservation IDs for every window.
+
+        """
+        days = self.df_reservations["day"].to_numpy()
+        final_days = self.df_reservations["final_day"].to_numpy()
+        IDs = self.df_reservations["ID"].to_numpy()
+        cuts = np.unique(np.quantile(days, np.linspace(0, 1, count + 1)[1:-1]).astype(np.int64))
+         # window k has the days from edges[k] up to and including edges[k + 1] - 1
+        edges = np.concatenate([[-1], cuts, [self.slots.daycount + 1]])
+        window = np.searchsorted(edges, days - 1, side = "right") - 1
+        inside = final_days + 1 < edges[window + 1]
+        return [IDs[inside & (window == k)].tolist() for k in range(len(edges) - 1)]
+    
+    def group_planner(self, cottage_IDs, reservation_IDs = None):
+        """
+        Function that creates a planner with only a group of cottages from cottage_groups and their reservations.
+        The days and combinations are taken from this planner instead of being calculated again.
+
+        Parameters
+        ----------
+        cottage_IDs : list
+            IDs of the cottages in the group.
+        reservation_IDs : list, optional
+            IDs of the only reservations the planner is allowed to move, None allows all reservations of the group. 
+            The default is None.
+
+        Returns
+        -------
+        planner : Planner
+            Planner with the cottages, reservations, combinations and assignments of the group.
+
+        """
+        planner = copy(self)
+        planner.telemetry = None
+        planner.combinations = self.combinations[self.combinations["ID_cot"].isin(cottage_IDs)]
+        if reservation_IDs != None: planner.combinations = planner.combinations[planner.combinations["ID_res"].isin(reservation_IDs)]
+        reservation_IDs = planner.combinations["ID_res"].unique()
+        planner.class_combinations = self.class_combinations[self.class_combinations["ID_res"].isin(reservation_IDs)]
+        planner.df_cottages = self.df_cottages[self.df_cottages["ID"].isin(cottage_IDs)]
+        planner.df_reservations = self.df_reservations[self.df_reservations["ID"].isin(reservation_IDs)]
+        planner.candidate_index = CandidateIndex(planner.combinations, planner.class_combinations, self.cottage_profiles)
+        planner.cottages = {ID: self.cottages[ID] for ID in cottage_IDs}
+        planner.assignment_index = {ID_res: assignment for ID_res, assignment in self.assignment_index.items() if assignment[0] in planner.cottages}
+        return planner
+    
+    def merge_assignments(self, assignments):
+        """
+        Function that moves the reservations whose cottage is different in assignments to that cottage.
+
+        Parameters
+        ----------
+        assignments : pd.Series
+            Series with reservation_ID as index and cottage number as value.
+
+        """
+        changed = [(ID_res, cottage_ID) for ID_res, cottage_ID in assignments.items() if self.assigned_cottage(ID_res) != cottage_ID]
+        for ID_res, cottage_ID in changed: 
+            if self.assigned_cottage(ID_res) != None: self.remove_assignment(ID_res)
+        for ID_res, cottage_ID in changed: self.add_assignment(cottage_ID, *self.reservation_option(ID_res, cottage_ID))
+    
     def legionella_optimiser(self, max_time = 300):
         """
         Function that finds cottages with legionella and tries to find reservations to remove legionella without creating new gaps.
@@ -437,43 +1260,98 @@ class Planner():
         has_improved : BOOL
             variable that tracks if any imprvements have been made..
 
+        """
+        return self.run_steps(self.legionella_optimiser_steps(Deadline(max_time)))
+    
+    def legionella_optimiser_steps(self, deadline):
+        """
+        Function that runs legionella_optimiser as a generator that yields (score, move) after every switch until deadline expires.
         """
         self.print_time("started improving legionella with a score of {}".format(self.score))
-        runtime = time()
-        has_improved = False
+        telemetry = self.telemetry
         itteration = 0
         if self.legionellas == 0:
             self.print_time("ended improving legionella with a score of {}".format(self.score))
-            return has_improved
+            return
         while True:
-            assignments = self.reservation_assignments()
-            options = self.combinations
-            options["edges"] = self.combinations["ID_cot"].map(lambda row: self.cottages[row].legionella_edges)
-            options = options[options["edges"].map(lambda row: row[0]) > 0]
-            options["begin_edge"] = options["edges"].map(lambda row: row[1])
-            options["end_edge"] = options["edges"].map(lambda row: row[2])
-            options = options.drop(columns = ["edges"])
-            options = options[(options["day"] < options["begin_edge"] + 22).multiply(options["day"] >= options["begin_edge"]).multiply(options["final_day"] > options["end_edge"] - 22).multiply(options["final_day"] <= options["end_edge"])]
-            
+            if telemetry != None: clock = perf_counter()
+            options = self.legionella_candidates()
+            if telemetry != None: telemetry.count("legionella_optimiser", "candidates", len(options))
             options = self.get_empty(options, options["day"] - 1, options["final_day"] + 1)
             if options.empty: 
+                if telemetry != None: self.reject("legionella_optimiser", clock)
                 self.print_time("ended improving legionella with a score of {}".format(self.score))
-                return has_improved
-            options = options[options["ID_res"].map(lambda ID: self.cottages[assignments[ID]].remove_no_legionella(ID))]
-            if options.empty: 
-                self.print_time("ended improving legionella with a score of {}".format(self.score))
-                return has_improved
+                return
+            if telemetry != None: telemetry.count("legionella_optimiser", "evaluated", len(options))
             options = options.drop_duplicates('ID_res', keep = 'first')
             options = options.drop_duplicates('ID_cot', keep = 'first')
+            if telemetry != None: clock = telemetry.lap("legionella_optimiser", "filtering", clock)
             for index, row in options.iterrows():
                 if not self.switch_cottage(row["ID_res"], row["ID_cot"]): print("error while switching cottages")
+                if telemetry != None: self.accept("legionella_optimiser", clock)
                 itteration += 1
-                has_improved = True
                 if itteration % 10 == 0: self.print_time("iteration {} with score {}".format(itteration, self.score))
-            if time() - runtime > max_time:
+                yield self.score, ("switch", row["ID_res"], row["ID_cot"])
+                if telemetry != None: clock = perf_counter()
+            if deadline.expired():
                 self.print_time("ended improving legionella with a score of {}".format(self.score))
-                return has_improved
+                return
+    
+    
+    def legionella_windows(self):
+        """
+        Function that finds the legionella gaps (22 or more empty days) of all cottages at once from the slot index.
+
+        Returns
+        -------
+        cottage_IDs, gap_starts, gap_ends : np.array
+            Cottage ID, first day and last day of every legionella gap.
+
+        """
+        cottage_IDs, gap_starts, gap_ends = self.slots.empty_runs(list(self.cottages))
+        legionella = gap_ends - gap_starts + 1 >= 22
+        return cottage_IDs[legionella], gap_starts[legionella], gap_ends[legionella]
     
+    def legionella_candidates(self):
+        """
+        Function that finds the reservations that can be moved into a legionella gap such that no part of the gap 
+        is 22 days or longer anymore, and that can be removed from their own cottage without creating a legionella gap there.
+
+        Returns
+        -------
+        options : pd.DataFrame
+            Copy of the rows of the combinations with the reservation and the cottage with the gap,
+            with the first and last day of the gap in "begin_edge" and "end_edge".
+
+        """
+        index = self.candidate_index
+        window_cottages, window_starts, window_ends = self.legionella_windows()
+        positions = [index.empty]
+        begin_edges = [np.zeros(0, dtype = np.int64)]
+        end_edges = [np.zeros(0, dtype = np.int64)]
+        for cottage_ID, gap_start, gap_end in zip(window_cottages.tolist(), window_starts.tolist(), window_ends.tolist()):
+            candidates = index.cottage(cottage_ID)
+            days = index.day[candidates]
+            final_days = days + index.length[candidates] - 1
+            fits = (days >= gap_start) & (days < gap_start + 22) & (final_days > gap_end - 22) & (final_days <= gap_end)
+            positions.append(candidates[fits])
+            begin_edges.append(np.full(fits.sum(), gap_start, dtype = np.int64))
+            end_edges.append(np.full(fits.sum(), gap_end, dtype = np.int64))
+        positions = np.concatenate(positions)
+        begin_edges = np.concatenate(begin_edges)
+        end_edges = np.concatenate(end_edges)
+         # the empty stretch the stay leaves behind in its own cottage must stay shorter than 22 days
+        stays = np.array([self.assignment_index.get(ID_res, (-1, 0, 0))[:3] for ID_res in index.ID_res[positions].tolist()], dtype = np.int64).reshape(-1, 3)
+        donors, start_days, end_days = stays[:, 0], stays[:, 1], stays[:, 2]
+        found, previous_ends = self.slots.previous_stay(donors, start_days - 1)
+        run_starts = np.where(found, previous_ends + 1, 0)
+        run_ends = self.slots.next_occupied(donors, end_days + 1) - 1
+        keep = (donors >= 0) & (run_ends - run_starts + 1 < 22) & ~np.isin(donors, window_cottages)
+        order = np.argsort(positions[keep], kind = "stable")
+        options = self.combinations.iloc[positions[keep][order]]
+        options["begin_edge"] = begin_edges[keep][order]
+        options["end_edge"] = end_edges[keep][order]
+        return options
     
     def upgrade_optimiser(self, max_time = 300):
         """
@@ -484,39 +1362,65 @@ class Planner():
         max_time : INT, optional
             Sets the maximum amount of seconds the function is allowed to run. The default is 600.. The default is 300.. The default is 300.
         """
+        return self.run_steps(self.upgrade_optimiser_steps(Deadline(max_time)))
+    
+    def upgrade_optimiser_steps(self, deadline):
+        """
+        Function that runs upgrade_optimiser as a generator that yields (score, move) after every swap until deadline expires.
+        """
         self.print_time("started improving upgrades with a score of {}".format(self.score))
-        runtime = time()
+        telemetry = self.telemetry
         itteration = 0
         while True:
-            assignments = self.reservation_assignments()
-            assignments_merged = pd.Series(assignments.reset_index().values.tolist())
-            assignments = assignments[assignments_merged.map(lambda row: self.cottages[row[1]].is_upgrade(row[0])).values]
+            if telemetry != None: clock = perf_counter()
+            upgraded = [ID_res for ID_res, assignment in self.assignment_index.items() if assignment[3]]
             options = self.df_reservations
-            options = options[options["ID"].isin(assignments.index)]
+            options = options[options["ID"].isin(upgraded)]
             options = pd.merge(options, options, how = "cross", suffixes = ("_1", "_2"))
             options = options[(options["day_1"] == options["day_2"]).multiply(options["final_day_1"] == options["final_day_2"]).multiply(options["ID_1"] != options["ID_2"])]
             options["improvement"] = options[["ID_1", "ID_2"]].values.tolist()
             options["improvement"] = options["improvement"].map(sorted)
             options["improvementstr"] = options["improvement"].map(str)
             options = options.drop_duplicates('improvementstr', keep = 'first')
-            options = options[options["improvement"].map(lambda reservation_ids: self.possible_upgrade(reservation_ids[0], reservation_ids[1], assignments))]
+            if telemetry != None: telemetry.count("upgrade_optimiser", "candidates", len(options))
+            options = options[options["improvement"].map(lambda reservation_ids: self.possible_upgrade(reservation_ids[0], reservation_ids[1]))]
             if options.empty:
+                if telemetry != None: self.reject("upgrade_optimiser", clock)
                 self.print_time("ended improving upgrades with a score of {}".format(self.score))
                 return
+            if telemetry != None: clock = telemetry.lap("upgrade_optimiser", "filtering", clock)
             while not options.empty:
                 reservations = options.iloc[0]
                 if not self.swap_cottages(reservations["ID_1"], reservations["ID_2"]): print("error while swapping cottages")
-                options = options[(options["ID_1"] != reservations["ID_1"]).multiply(options["ID_1"] != reservations["ID_2"]).multiply(options["ID_2"] != reservations["ID_1"]).multiply(options["ID_2"] != reservations["ID_2"])]
+                if telemetry != None: self.accept("upgrade_optimiser", clock)
                 itteration += 1
                 if itteration % 10 == 0: self.print_time("iteration {} with score {}".format(itteration, self.score))
-            if time() - runtime > max_time:
+                yield self.score, ("swap", reservations["ID_1"], reservations["ID_2"])
+                if telemetry != None: clock = perf_counter()
+                options = options[(options["ID_1"] != reservations["ID_1"]).multiply(options["ID_1"] != reservations["ID_2"]).multiply(options["ID_2"] != reservations["ID_1"]).multiply(options["ID_2"] != reservations["ID_2"])]
+            if deadline.expired():
                 self.print_time("ended improving upgrades with a score of {}".format(self.score))
                 return
 
 
     def fritothugaps_optimiser(self, max_time = 300):
+        """
+        Function that swaps reservations next to gaps that start on a friday or saturday or end on a wednesday or thursday,
+        to remove the gaps from friday to thursday.
+
+        Parameters
+        ----------
+        max_time : INT, optional
+            Sets the maximum amount of seconds the function is allowed to run. The default is 300.
+        """
+        return self.run_steps(self.fritothugaps_optimiser_steps(Deadline(max_time)))
+    
+    def fritothugaps_optimiser_steps(self, deadline):
+        """
+        Function that runs fritothugaps_optimiser as a generator that yields (score, move) after every swap until deadline expires.
+        """
         self.print_time("started improving fritothugaps with a score of {}".format(self.score))
-        runtime = time()
+        telemetry = self.telemetry
         itteration = 0
         while True:
             improved = False
@@ -532,15 +1436,22 @@ class Planner():
                         last = filler
                         if (filler[1] + self.start_weekday) % 7 in [4, 5]:
                             if front_reservation != None:
+                                if telemetry != None: clock = perf_counter()
                                 options = self.filter_fritothuoptions(front_reservation, filler, cottage.ID, "left")
-                                print(1)
-                                if not options.empty:
-                                    print(2)
+                                if telemetry != None: telemetry.count("fritothugaps_optimiser", "evaluated")
+                                if options.empty: 
+                                    if telemetry != None: self.reject("fritothugaps_optimiser", clock)
+                                else:
+                                    if telemetry != None:
+                                        clock = telemetry.lap("fritothugaps_optimiser", "filtering", clock)
+                                        telemetry.count("fritothugaps_optimiser", "candidates", len(options))
                                     success = self.swap_cottages(front_reservation[0][0], options.iloc[0]["ID_res"])
                                     if success: 
+                                        if telemetry != None: self.accept("fritothugaps_optimiser", clock)
                                         improved = True
                                         itteration += 1
                                         if itteration % 10 == 0: self.print_time("iteration {} with score {}".format(itteration, self.score))
+                                        yield self.score, ("swap", front_reservation[0][0], options.iloc[0]["ID_res"])
                                     else: print("error while swapping cottages")
                                     
                         if (not success or filler[2] - filler[1] >= 10) and (filler[2] + self.start_weekday) % 7 in [2, 3]:
@@ -548,19 +1459,27 @@ class Planner():
                         else: gap = None
                     else:
                         if gap != None and last[0] == None:
+                            if telemetry != None: clock = perf_counter()
                             options = self.filter_fritothuoptions(filler, gap, cottage.ID, "right")
-                            if not options.empty:
-                                print(options.iloc[0]["ID_res"], filler[0][0], cottage.ID, )
+                            if telemetry != None: telemetry.count("fritothugaps_optimiser", "evaluated")
+                            if options.empty: 
+                                if telemetry != None: self.reject("fritothugaps_optimiser", clock)
+                            else:
+                                if telemetry != None:
+                                    clock = telemetry.lap("fritothugaps_optimiser", "filtering", clock)
+                                    telemetry.count("fritothugaps_optimiser", "candidates", len(options))
                                 success = self.swap_cottages(filler[0][0], options.iloc[0]["ID_res"])
                                 if success: 
+                                    if telemetry != None: self.accept("fritothugaps_optimiser", clock)
                                     improved = True
                                     itteration += 1
                                     if itteration % 10 == 0: self.print_time("iteration {} with score {}".format(itteration, self.score))
+                                    yield self.score, ("swap", filler[0][0], options.iloc[0]["ID_res"])
                                 else: print("error while swapping cottages")
                                 
                         last = filler
                 
-                    if time() - runtime > max_time:
+                    if deadline.expired():
                         self.print_time("ended improving fritothugaps with a score of {}".format(self.score))
                         return
             if not improved:
@@ -568,7 +1487,290 @@ class Planner():
                 return
 
 
-    def find_gap_improvement_3_caller(self, gaps, cottage_ID, itteration):
+    def lns_optimiser(self, max_time = 300, destroy_size = 8, regret = False, seed = None):
+        """
+        Function that uses large neighbourhood search: it removes a block of reservations and puts them back in the cheapest cottages,
+        so several reservations can move together. The new planning is kept if the score is not worse.
+        A block is either all reservations around the stay of a random reservation in the cottages that reservation is allowed in,
+        or the reservations next to and inside a legionella gap in the cottages they are allowed in.
+
+        Parameters
+        ----------
+        max_time : INT, optional
+            Sets the maximum amount of seconds the function is allowed to run. The default is 300.
+        destroy_size : INT, optional
+            Maximum amount of reservations that are removed at once. The default is 8.
+        regret : BOOL, optional
+            If True the reservations are put back by regret (the largest difference between the best and second best cottage first), 
+            otherwise greedy in a random order. The default is False.
+        seed : INT, optional
+            Seed of the random generator. The default is None.
+
+        Returns
+        -------
+        BOOL
+            True if the score has improved.
+
+        """
+        return self.run_steps(self.lns_optimiser_steps(Deadline(max_time), destroy_size, regret, seed))
+    
+    def lns_optimiser_steps(self, deadline, destroy_size = 8, regret = False, seed = None):
+        """
+        Function that runs lns_optimiser as a generator that yields (score, move) after every improvement until deadline expires.
+        The move is ("lns", IDs of the removed reservations).
+        """
+        self.print_time("started large neighbourhood search with a score of {}".format(self.score))
+        rng = np.random.default_rng(seed)
+        movable = [ID_res for ID_res in self.assignment_index if len(self.candidate_index.reservation(ID_res)) > 1]
+        score = self.score
+        telemetry = self.telemetry
+        itteration = 0
+        tried = 0
+        while movable and not deadline.expired():
+            if telemetry != None: clock = perf_counter()
+            legionella = [(cottage.ID, gap_start, gap_end) for cottage in self.cottages.values() for gap_start, gap_end in cottage.legionella_gaps.items()]
+            if legionella and rng.random() < 0.5: block = self.lns_legionella_block(legionella[rng.integers(len(legionella))], rng)
+            else: block = self.lns_window_block(movable[rng.integers(len(movable))], rng)
+            if len(block) > destroy_size: block = rng.choice(block, destroy_size, replace = False).tolist()
+            else: rng.shuffle(block)
+            if telemetry != None:
+                clock = telemetry.lap("lns_optimiser", "filtering", clock)
+                telemetry.count("lns_optimiser", "candidates", len(block))
+            tried += 1
+            removed = list()
+            delta = 0
+            for ID_res in block:
+                assignment = self.assignment_index[ID_res]
+                delta += self.cottages[assignment[0]].change_score(removed = assignment[1:])
+                removed.append((ID_res, self.remove_assignment(ID_res)))
+            placed, change = self.lns_repair(block, regret)
+            if telemetry != None:
+                clock = telemetry.lap("lns_optimiser", "scoring", clock)
+                telemetry.count("lns_optimiser", "evaluated")
+            if change == None or delta + change > 0:
+                 # undo the repair and put the removed reservations back where they were
+                for ID_res in placed: self.remove_assignment(ID_res)
+                for ID_res, assignment in removed: self.add_assignment(assignment[0], (ID_res, assignment[3]), assignment[1], assignment[2] - assignment[1] + 1)
+                if telemetry != None: self.reject("lns_optimiser", clock)
+                continue
+            if telemetry != None: self.accept("lns_optimiser", clock)
+            if delta + change < 0:
+                score += delta + change
+                itteration += 1
+                if itteration % 100 == 0: self.print_time("iteration {} with score {}".format(itteration, score))
+                yield score, ("lns", block)
+        self.print_time("tried {} blocks, improved {} times".format(tried, itteration))
+        self.print_time("ended large neighbourhood search with a score of {}".format(self.score))
+    
+    def lns_window_block(self, ID_res, rng):
+        """
+        Function that returns the movable reservations that overlap the stay of a reservation with a random margin,
+        in the cottages that reservation is allowed in.
+        """
+        cottage_ID, start_day, end_day, upgrade = self.assignment_index[ID_res]
+        margin = int(rng.integers(0, 8))
+        block = list()
+        for cottage_ID in self.candidate_index.allowed_cottages(ID_res).tolist():
+            block += self.cottages[cottage_ID].overlapping(start_day - margin, end_day + margin)
+        return [ID for ID in block if len(self.candidate_index.reservation(ID)) > 1]
+    
+    def lns_legionella_block(self, gap, rng):
+        """
+        Function that returns the movable reservations next to a legionella gap and the reservations inside the gap
+        in the cottages the reservations next to it are allowed in.
+        """
+        cottage_ID, gap_start, gap_end = gap
+        cottage = self.cottages[cottage_ID]
+        block = cottage.overlapping(gap_start - 1, gap_end + 1)
+        cottage_IDs = set()
+        for ID_res in block: cottage_IDs.update(self.candidate_index.allowed_cottages(ID_res).tolist())
+        for other_ID in cottage_IDs:
+            if other_ID != cottage_ID: block += self.cottages[other_ID].overlapping(gap_start, gap_end)
+        return [ID for ID in block if len(self.candidate_index.reservation(ID)) > 1]
+    
+    def lns_repair(self, reservations, regret = False):
+        """
+        Function that puts removed reservations back, each in the cottage where it adds the least to the score.
+        
+        Parameters
+        ----------
+        reservations : list
+            IDs of the reservations that are not assigned, in the order they are put back without regret.
+        regret : BOOL, optional
+            If True the reservation with the largest difference between its best and second best cottage is put back first. 
+            The default is False.
+
+        Returns
+        -------
+        (placed : list, delta : INT or None)
+            IDs of the reservations that have been put back and the change of the score, 
+            delta is None if a reservation doesn't fit in any cottage.
+
+        """
+        index = self.candidate_index
+        options = dict()
+        for ID_res in reservations:
+            positions = index.reservation(ID_res)
+            options[ID_res] = list(zip(index.ID_cot[positions].tolist(), index.day[positions].tolist(), \
+                                       index.length[positions].tolist(), index.upgrade[positions].tolist()))
+        remaining = list(reservations)
+        placed = list()
+        delta = 0
+        while remaining:
+            choice_made = None
+            for ID_res in remaining:
+                best = second = (inf, None)
+                for option in options[ID_res]:
+                    change = self.cottages[option[0]].change_score(added = (option[1], option[1] + option[2] - 1, option[3]))
+                    if change == None: continue
+                    if change < best[0]: best, second = (change, option), best
+                    elif change < second[0]: second = (change, option)
+                if best[1] == None: return placed, None
+                if not regret:
+                    choice_made = (ID_res, best)
+                    break
+                 # a reservation with only one cottage left has to go first
+                if choice_made == None or second[0] - best[0] > choice_made[2]: choice_made = (ID_res, best, second[0] - best[0])
+            ID_res, (change, option) = choice_made[:2]
+            self.add_assignment(option[0], (ID_res, option[3]), option[1], option[2])
+            remaining.remove(ID_res)
+            placed.append(ID_res)
+            delta += change
+        return placed, delta
+    
+    def ejection_chain_optimiser(self, max_time = 300, depth = 4, width = 5):
+        """
+        Function that tries to close the gaps with ejection chains: a reservation moves into the gap, another reservation
+        moves into the place it left, and so on, up to depth moves through different cottages. The best chain of every gap is applied
+        if it improves the score, until a pass over all gaps finds no improving chain.
+
+        Parameters
+        ----------
+        max_time : INT, optional
+            Sets the maximum amount of seconds the function is allowed to run. The default is 300.
+        depth : INT, optional
+            Maximum amount of moves in a chain. The default is 4.
+        width : INT, optional
+            Amount of reservations that are tried at every step of a chain, the ones that are the cheapest in that step. The default is 5.
+
+        Returns
+        -------
+        BOOL
+            True if the score has improved.
+
+        """
+        return self.run_steps(self.ejection_chain_optimiser_steps(Deadline(max_time), depth, width))
+    
+    def ejection_chain_optimiser_steps(self, deadline, depth = 4, width = 5):
+        """
+        Function that runs ejection_chain_optimiser as a generator that yields (score, move) after every applied chain until deadline expires.
+        The move is ("ejection_chain", list of (ID_res, new cottage_ID)).
+        """
+        self.print_time("started ejection chains with a score of {}".format(self.score))
+        score = self.score
+        telemetry = self.telemetry
+        itteration = 0
+        improved = True
+        while improved:
+            improved = False
+            for cottage_ID, cottage in self.cottages.items():
+                for gap in cottage.get_gaps():
+                    if deadline.expired():
+                        self.print_time("ended ejection chains with a score of {}".format(self.score))
+                        return
+                    if telemetry != None: clock = perf_counter()
+                    delta, moves = self.ejection_chain(cottage_ID, gap[1], gap[2], depth, width)
+                    if telemetry != None: telemetry.count("ejection_chain_optimiser", "evaluated")
+                    if moves == None:
+                        if telemetry != None: self.reject("ejection_chain_optimiser", clock)
+                        continue
+                    if telemetry != None: clock = telemetry.lap("ejection_chain_optimiser", "scoring", clock)
+                    self.apply_chain(moves)
+                    if telemetry != None: self.accept("ejection_chain_optimiser", clock)
+                    score += delta
+                    improved = True
+                    itteration += 1
+                    if itteration % 10 == 0: self.print_time("iteration {} with score {}".format(itteration, score))
+                    yield score, ("ejection_chain", moves)
+                     # the other gaps of this cottage have changed
+                    break
+        self.print_time("ended ejection chains with a score of {}".format(self.score))
+    
+    def ejection_chain(self, cottage_ID, gap_start, gap_end, depth = 4, width = 5):
+        """
+        Function that finds the best ejection chain that starts by moving a reservation into a gap.
+
+        Parameters
+        ----------
+        cottage_ID : INT
+            ID of the cottage with the gap.
+        gap_start : INT
+            first day of the gap.
+        gap_end : INT
+            last day of the gap.
+        depth : INT, optional
+            Maximum amount of moves in the chain. The default is 4.
+        width : INT, optional
+            Amount of reservations that are tried at every step. The default is 5.
+
+        Returns
+        -------
+        (delta : INT, moves : list)
+            The change of the score and the list of (ID_res, new cottage_ID) of the best chain, 
+            moves is None if no chain improves the score.
+
+        """
+        best = [0, None]
+        self.extend_chain(cottage_ID, None, gap_start, gap_end, 0, list(), {cottage_ID}, depth, width, best)
+        return best[0], best[1]
+    
+    def extend_chain(self, cottage_ID, removed, first_day, last_day, partial, moves, chain, depth, width, best):
+        """
+        Function that adds one move to an ejection chain: a reservation from a cottage outside the chain moves into cottage_ID,
+        where the stay removed has left. The candidates come from the candidate index and must lie in the empty days from first_day
+        up to and including last_day and overlap removed. Every chain that is found is closed by leaving the place of the last
+        reservation empty and stored in best if it is better.
+        """
+        index = self.candidate_index
+        positions = index.cottage(cottage_ID)
+        days = index.day[positions]
+        final_days = days + index.length[positions] - 1
+        fits = (days >= first_day) & (final_days <= last_day)
+        if removed != None: fits &= (days <= removed[1]) & (final_days >= removed[0])
+        positions = positions[fits]
+        cottage = self.cottages[cottage_ID]
+        options = list()
+        for ID_res, day, length, upgrade in zip(index.ID_res[positions].tolist(), index.day[positions].tolist(), \
+                                                index.length[positions].tolist(), index.upgrade[positions].tolist()):
+            assignment = self.assignment_index.get(ID_res)
+            if assignment == None or assignment[0] in chain: continue
+            change = cottage.change_score(removed = removed, added = (day, day + length - 1, upgrade))
+            if change != None: options.append((change, ID_res, assignment))
+        options.sort(key = lambda option: option[0])
+        for change, ID_res, assignment in options[:width]:
+            old_cottage = self.cottages[assignment[0]]
+            old = assignment[1:]
+            moves.append((ID_res, cottage_ID))
+            closed = partial + change + old_cottage.change_score(removed = old)
+            if closed < best[0]: best[0], best[1] = closed, list(moves)
+            if depth > 1:
+                free_start, free_end = old_cottage.free_run(old[0], old[1], vacated = old[:2])
+                chain.add(assignment[0])
+                self.extend_chain(assignment[0], old, free_start, free_end, partial + change, moves, chain, depth - 1, width, best)
+                chain.remove(assignment[0])
+            moves.pop()
+    
+    def apply_chain(self, moves):
+        """
+        Function that moves the reservations of an ejection chain to their new cottages.
+        """
+        for ID_res, cottage_ID in moves: self.remove_assignment(ID_res)
+        for ID_res, cottage_ID in moves: self.add_assignment(cottage_ID, *self.reservation_option(ID_res, cottage_ID))
+    
+    def find_gap_improvement_3_caller(self, gaps, cottage_ID):
+        """
+        Function that tries find_gap_improvement_3 on the gaps of a cottage and yields (score, move) after every improvement.
+        """
         compressed = self.cottages[cottage_ID].compressed_days()
         for swap_set in range(gaps - 1):
             first_gap = None
@@ -579,9 +1781,8 @@ class Planner():
                     if first_gap == None: first_gap = filler
                     else:
                         if self.find_gap_improvement_3(cottage_ID, first_gap[1], middle_reservation[0][0], filler[2]):
+                            yield self.score, ("gaps_3", cottage_ID, first_gap[1], filler[2])
                             first_gap = None
-                            itteration += 1
-                            if itteration % 10 == 0: self.print_time("iteration {} with score {}".format(itteration, self.score))
                         else:
                             first_gap = filler
                 elif last == None:
@@ -589,7 +1790,6 @@ class Planner():
                     last = filler
                 else: 
                     first_gap = None
-        return itteration
 
 
     def find_gap_improvement_1(self, cottage_ID, gap_start, gap_end, front_reservation):
@@ -613,18 +1813,25 @@ class Planner():
             variable that indicates if an inporvement has been made.
 
         """
-        combinations = self.combinations
-        assignments = self.reservation_assignments()
-        allowed_reservations = assignments[assignments.isin(combinations[combinations["ID_res"] == front_reservation[0][0]]["ID_cot"])].index
-        options = combinations[combinations["ID_cot"] == cottage_ID]
-        options = options[options["day"] == front_reservation[1]]
-        options = options[options["final_day"] == gap_end]
-        if options.empty: return False
-        options = options[options["ID_res"].isin(allowed_reservations)]
-        if options.empty: return False
+        telemetry = self.telemetry
+        if telemetry != None: clock = perf_counter()
+        options = self.combinations.iloc[self.candidate_index.cottage_day_final(cottage_ID, front_reservation[1], gap_end)]
+        if telemetry != None: telemetry.count("gaps_optimiser", "candidates", len(options))
+        if options.empty:
+            if telemetry != None: self.reject("gaps_optimiser", clock, 0)
+            return False
+        options = self.assigned_in(options, self.candidate_index.allowed_cottages(front_reservation[0][0]))
+        if options.empty:
+            if telemetry != None: self.reject("gaps_optimiser", clock)
+            return False
+        if telemetry != None: telemetry.count("gaps_optimiser", "evaluated", len(options))
         options = self.get_empty(options, front_reservation[1] - 1, gap_end + 1, side = "right")
-        if options.empty: return False
+        if options.empty:
+            if telemetry != None: self.reject("gaps_optimiser", clock)
+            return False
+        if telemetry != None: clock = telemetry.lap("gaps_optimiser", "filtering", clock)
         if not self.swap_cottages(front_reservation[0][0], options.iloc[0]["ID_res"]): print("error while swapping cottages")
+        if telemetry != None: self.accept("gaps_optimiser", clock)
         return True
     
     def find_gap_improvement_2(self, cottage_ID, gap_start, gap_end, back_reservation):
@@ -648,18 +1855,25 @@ class Planner():
             variable that indicates if an inporvement has been made.
 
         """
-        combinations = self.combinations
-        assignments = self.reservation_assignments()
-        allowed_reservations = assignments[assignments.isin(combinations[combinations["ID_res"] == back_reservation[0][0]]["ID_cot"])].index
-        # options = combinations[(combinations["ID_cot"] == cottage_ID).multiply(combinations["day"] == gap_start).multiply(combinations["final_day"] == back_reservation[2]).multiply(combinations["ID_res"].isin(allowed_reservations))]
-        options = combinations[combinations["ID_cot"] == cottage_ID]
-        options = options[options["day"] == gap_start]
-        options = options[options["final_day"] == back_reservation[2]]
-        options = options[options["ID_res"].isin(allowed_reservations)]
-        if options.empty: return False
+        telemetry = self.telemetry
+        if telemetry != None: clock = perf_counter()
+        options = self.combinations.iloc[self.candidate_index.cottage_day_final(cottage_ID, gap_start, back_reservation[2])]
+        if telemetry != None: telemetry.count("gaps_optimiser", "candidates", len(options))
+        if options.empty:
+            if telemetry != None: self.reject("gaps_optimiser", clock, 0)
+            return False
+        options = self.assigned_in(options, self.candidate_index.allowed_cottages(back_reservation[0][0]))
+        if options.empty:
+            if telemetry != None: self.reject("gaps_optimiser", clock)
+            return False
+        if telemetry != None: telemetry.count("gaps_optimiser", "evaluated", len(options))
         options = self.get_empty(options, gap_start - 1, back_reservation[2] + 1, side = "left")
-        if options.empty: return False
+        if options.empty:
+            if telemetry != None: self.reject("gaps_optimiser", clock)
+            return False
+        if telemetry != None: clock = telemetry.lap("gaps_optimiser", "filtering", clock)
         if not self.swap_cottages(back_reservation[0][0], options.iloc[0]["ID_res"]): print("error while swapping cottages")
+        if telemetry != None: self.accept("gaps_optimiser", clock)
         return True
 
 
@@ -684,21 +1898,27 @@ class Planner():
             variable that indicates if an inporvement has been made.
 
         """
-        assignments = self.reservation_assignments()
-        combinations = self.combinations
-        allowed_reservations = assignments[assignments.isin(combinations[combinations["ID_res"] == middle_reservation]["ID_cot"])].index
-        # options = combinations[(combinations["ID_cot"] == cottage_ID).multiply(combinations["day"] == first_gap_start).multiply(combinations["final_day"] == second_gap_end).multiply(combinations["ID_res"].isin(allowed_reservations))]
-        options = combinations[(combinations["ID_cot"] == cottage_ID)]
-        options = options[options["day"] == first_gap_start]
-        options = options[options["final_day"] == second_gap_end]
-        if options.empty: return False
-        options = options[options["ID_res"].isin(allowed_reservations)]
-        if options.empty: return False
+        telemetry = self.telemetry
+        if telemetry != None: clock = perf_counter()
+        options = self.combinations.iloc[self.candidate_index.cottage_day_final(cottage_ID, first_gap_start, second_gap_end)]
+        if telemetry != None: telemetry.count("gaps_optimiser", "candidates", len(options))
+        if options.empty:
+            if telemetry != None: self.reject("gaps_optimiser", clock, 0)
+            return False
+        options = self.assigned_in(options, self.candidate_index.allowed_cottages(middle_reservation))
+        if options.empty:
+            if telemetry != None: self.reject("gaps_optimiser", clock)
+            return False
+        if telemetry != None: telemetry.count("gaps_optimiser", "evaluated", len(options))
         options = self.get_empty(options, first_gap_start - 1, second_gap_end + 1, side = "both")
-        if options.empty: return False
+        if options.empty:
+            if telemetry != None: self.reject("gaps_optimiser", clock)
+            return False
+        if telemetry != None: clock = telemetry.lap("gaps_optimiser", "filtering", clock)
         if not self.swap_cottages(options.iloc[0]["ID_res"], middle_reservation):
             print("error while swapping cottages")
             return False
+        if telemetry != None: self.accept("gaps_optimiser", clock)
         return True
         
         
@@ -721,14 +1941,23 @@ class Planner():
             variable that indicates if an inporvement has been made.
 
         """
-        combinations = self.combinations
-        options = combinations[(combinations["ID_cot"] == cottage_ID).multiply(combinations["day"] == gap_start).multiply(combinations["final_day"] == gap_end)]
-        if options.empty: return False
+        telemetry = self.telemetry
+        if telemetry != None: clock = perf_counter()
+        options = self.combinations.iloc[self.candidate_index.cottage_day_final(cottage_ID, gap_start, gap_end)]
+        if telemetry != None: telemetry.count("gaps_optimiser", "candidates", len(options))
+        if options.empty:
+            if telemetry != None: self.reject("gaps_optimiser", clock, 0)
+            return False
+        if telemetry != None: telemetry.count("gaps_optimiser", "evaluated", len(options))
         options = self.get_empty(options, gap_start - 1, gap_end + 1, side = "both")
-        if options.empty: return False
+        if options.empty:
+            if telemetry != None: self.reject("gaps_optimiser", clock)
+            return False
+        if telemetry != None: clock = telemetry.lap("gaps_optimiser", "filtering", clock)
         if not self.switch_cottage(options.iloc[0]["ID_res"], cottage_ID):
             print("error while switching cottages")
             return False
+        if telemetry != None: self.accept("gaps_optimiser", clock)
         return True
         
 
@@ -756,17 +1985,15 @@ class Planner():
         if side not in ["left", "right", "both"]:
             print("get_empty: invalid side {}".format(side))
             return options
-        assignments = self.reservation_assignments()
+         # the days are checked in the cottage the reservation is assigned to, all rows at once with the slot index
+        cottage_IDs = np.array([self.assignment_index.get(ID_res, (-1,))[0] for ID_res in options["ID_res"].tolist()], dtype = np.int64)
+        assigned = cottage_IDs >= 0
         if side == "left" or side == "both":
-            options["left_empty"] = start
-            options["left_empty"] = options[["ID_res", "left_empty"]].values.tolist()
-            if reverse: options["left_empty"] = ~options["left_empty"].map(lambda row: self.cottages[assignments[row[0]]].empty_day(row[1]))
-            else: options["left_empty"] = options["left_empty"].map(lambda row: self.cottages[assignments[row[0]]].empty_day(row[1]))
+            empty = self.slots.days_free(cottage_IDs, pd.Series(start, index = options.index).to_numpy())
+            options["left_empty"] = (~empty if reverse else empty) & assigned
         if side == "right" or side == "both":
-            options["right_empty"] = end
-            options["right_empty"] = options[["ID_res", "right_empty"]].values.tolist()
-            if reverse: options["right_empty"] = ~options["right_empty"].map(lambda row: self.cottages[assignments[row[0]]].empty_day(row[1]))
-            else: options["right_empty"] = options["right_empty"].map(lambda row: self.cottages[assignments[row[0]]].empty_day(row[1]))
+            empty = self.slots.days_free(cottage_IDs, pd.Series(end, index = options.index).to_numpy())
+            options["right_empty"] = (~empty if reverse else empty) & assigned
         
         if side == "left":
             options = options[options["left_empty"]]
@@ -781,7 +2008,7 @@ class Planner():
             return options
 
 
-    def possible_upgrade(self, ID_res1, ID_res2, assignments):
+    def possible_upgrade(self, ID_res1, ID_res2):
         """
         Function that tests if a swap between the reservations is possible and will reduce the amount of upgrades.
 
@@ -791,8 +2018,6 @@ class Planner():
             ID of first reservation.
         ID_res2 : INT
             ID of second reservation.
-        assignments : Series
-            self.reservation_assignments.
 
         Returns
         -------
@@ -800,38 +2025,30 @@ class Planner():
             variable that indicates if switching the reservations will be benificial.
 
         """
-        combinations = self.combinations
-        cottage1 = assignments.loc[ID_res1]
-        cottage2 = assignments.loc[ID_res2]
-        index1 = self.IDs_to_index(ID_res1, cottage2)
-        index2 = self.IDs_to_index(ID_res2, cottage1)
-        if index1 not in combinations.index or index2 not in combinations.index: return False
-        return not bool(combinations.loc[index1]["upgrade"] * combinations.loc[index2]["upgrade"])
+        cottage1 = self.assigned_cottage(ID_res1)
+        cottage2 = self.assigned_cottage(ID_res2)
+        position1 = self.candidate_index.position(ID_res1, cottage2)
+        position2 = self.candidate_index.position(ID_res2, cottage1)
+        if position1 < 0 or position2 < 0: return False
+        return not bool(self.candidate_index.upgrade[position1] * self.candidate_index.upgrade[position2])
 
 
     def filter_fritothuoptions(self, reservation, gap, cottage_ID, side):
-        assignments = self.reservation_assignments()
-        combinations = self.combinations
-        allowed_reservations = assignments[assignments.isin(combinations[combinations["ID_res"] == reservation[0][0]]["ID_cot"])].index
-        options = combinations[combinations["ID_cot"] == cottage_ID]
-        
         if side == "right":
-            options = options[options["day"] == reservation[1]]
+            options = self.combinations.iloc[self.candidate_index.cottage_day(cottage_ID, reservation[1])]
             options = options[options["final_day"] < gap[1] - (gap[1] + self.start_weekday) % 7 - 3]
             options = options[options["final_day"] > gap[2] - 21]
             options = self.get_empty(options, reservation[1], options["final_day"] + 1, side = "right")
             if options.empty: return options
             options = self.get_empty(options, reservation[1], options["final_day"] + 7, side = "right", reverse = True)
         else:
-            options = options[options["final_day"] == reservation[2]]
+            options = self.combinations.iloc[self.candidate_index.cottage_final(cottage_ID, reservation[2])]
             options = options[options["day"] > gap[2] + (reservation[2] + self.start_weekday) % 7 - 1]
             options = options[options["day"] < gap[1] + 21]
             options = self.get_empty(options, options["day"] - 1, reservation[2], side = "left")
             if options.empty: return options
             options = self.get_empty(options, options["day"] - 7, reservation[2], side = "left", reverse = True)
-        if options.empty: return options
-        options = options[options["ID_res"].isin(allowed_reservations)]
-        return options       
+        return self.assigned_in(options, self.candidate_index.allowed_cottages(reservation[0][0]))
 
 
     def switch_cottage(self, ID_res, new_cottage_ID):
@@ -851,13 +2068,11 @@ class Planner():
             Variable that indicates if the switch is succesfull.
 
         """
-        combinations = self.combinations
-        assignments = self.reservation_assignments()
-        reservation_old = self.cottages[assignments.loc[ID_res]].find_reservation(ID_res)
-        reservation_new = combinations.loc[(combinations["ID_res"] == ID_res).multiply(combinations["ID_cot"] == new_cottage_ID)].squeeze()
-        if self.cottages[new_cottage_ID].allowed_reservation((reservation_new["ID_res"], reservation_new["upgrade"]), reservation_new["day"], reservation_new["Length of Stay"]):
-            self.cottages[assignments.loc[ID_res]].remove_reservation(reservation_old)
-            self.cottages[new_cottage_ID].add_reservation((reservation_new["ID_res"], reservation_new["upgrade"]), reservation_new["day"], reservation_new["Length of Stay"])
+        option = self.reservation_option(ID_res, new_cottage_ID)
+        if option == None: return False
+        if self.cottages[new_cottage_ID].allowed_reservation(*option):
+            self.remove_assignment(ID_res)
+            self.add_assignment(new_cottage_ID, *option)
             return True
         return False
     
@@ -878,25 +2093,82 @@ class Planner():
             Indicates id the swap was succesfull.
 
         """
-        combinations = self.combinations
-        assignments = self.reservation_assignments()
-        cottage1 = assignments.loc[ID_res1]
-        cottage2 = assignments.loc[ID_res2]
-        reservation_old1 = self.cottages[cottage1].find_reservation(ID_res1)
-        reservation_old2 = self.cottages[cottage2].find_reservation(ID_res2)
-        reservation_new1 = combinations.loc[(combinations["ID_res"] == ID_res1).multiply(combinations["ID_cot"] == cottage2)].squeeze()
-        reservation_new2 = combinations.loc[(combinations["ID_res"] == ID_res2).multiply(combinations["ID_cot"] == cottage1)].squeeze()
-        if type(reservation_new1) != pd.Series or type(reservation_new2) != pd.Series: return False
-        self.cottages[cottage1].remove_reservation(reservation_old1)
-        self.cottages[cottage2].remove_reservation(reservation_old2)
-        if self.cottages[cottage2].allowed_reservation((reservation_new1["ID_res"], reservation_new1["upgrade"]), reservation_new1["day"], reservation_new1["Length of Stay"]) and \
-           self.cottages[cottage1].allowed_reservation((reservation_new2["ID_res"], reservation_new2["upgrade"]), reservation_new2["day"], reservation_new2["Length of Stay"]):
-               self.cottages[cottage2].add_reservation((reservation_new1["ID_res"], reservation_new1["upgrade"]), reservation_new1["day"], reservation_new1["Length of Stay"])
-               self.cottages[cottage1].add_reservation((reservation_new2["ID_res"], reservation_new2["upgrade"]), reservation_new2["day"], reservation_new2["Length of Stay"])
+        cottage1 = self.assigned_cottage(ID_res1)
+        cottage2 = self.assigned_cottage(ID_res2)
+        option1 = self.reservation_option(ID_res1, cottage2)
+        option2 = self.reservation_option(ID_res2, cottage1)
+        if option1 == None or option2 == None: return False
+        old1 = self.remove_assignment(ID_res1)
+        old2 = self.remove_assignment(ID_res2)
+        if self.cottages[cottage2].allowed_reservation(*option1) and self.cottages[cottage1].allowed_reservation(*option2):
+               self.add_assignment(cottage2, *option1)
+               self.add_assignment(cottage1, *option2)
                return True
-        self.cottages[cottage1].add_reservation((reservation_new1["ID_res"], reservation_new1["upgrade"]), reservation_new1["day"], reservation_new1["Length of Stay"])
-        self.cottages[cottage2].add_reservation((reservation_new2["ID_res"], reservation_new2["upgrade"]), reservation_new2["day"], reservation_new2["Length of Stay"])
+        self.add_assignment(cottage1, (ID_res1, old1[3]), old1[1], old1[2] - old1[1] + 1)
+        self.add_assignment(cottage2, (ID_res2, old2[3]), old2[1], old2[2] - old2[1] + 1)
         return False
+    
+    def evaluate_switch(self, ID_res, new_cottage_ID):
+        """
+        Function that calculates what switch_cottage would do to the score, without changing anything.
+        Only the gaps next to the old and the new stay are looked at.
+
+        Parameters
+        ----------
+        ID_res : INT
+            ID of the reservation that would be switched.
+        new_cottage_ID : INT
+            ID of the cottage the reservation would go to.
+
+        Returns
+        -------
+        (feasible : BOOL, delta : INT)
+            Whether the switch is possible and the new score minus the current score.
+
+        """
+        old = self.assignment_index.get(ID_res)
+        option = self.reservation_option(ID_res, new_cottage_ID)
+        if old == None or option == None or old[0] == new_cottage_ID: return False, 0
+        added = self.cottages[new_cottage_ID].change_score(added = self.option_stay(option))
+        if added == None: return False, 0
+        return True, added + self.cottages[old[0]].change_score(removed = old[1:])
+    
+    def evaluate_swap(self, ID_res1, ID_res2):
+        """
+        Function that calculates what swap_cottages would do to the score, without changing anything.
+        Only the gaps next to the swapped stays are looked at.
+
+        Parameters
+        ----------
+        ID_res1 : INT
+            ID of the first reservation.
+        ID_res2 : INT
+            ID of the second reservation.
+
+        Returns
+        -------
+        (feasible : BOOL, delta : INT)
+            Whether the swap is possible and the new score minus the current score.
+            Two reservations in the same cottage can't be swapped.
+
+        """
+        old1 = self.assignment_index.get(ID_res1)
+        old2 = self.assignment_index.get(ID_res2)
+        if old1 == None or old2 == None or old1[0] == old2[0]: return False, 0
+        option1 = self.reservation_option(ID_res1, old2[0])
+        option2 = self.reservation_option(ID_res2, old1[0])
+        if option1 == None or option2 == None: return False, 0
+        delta1 = self.cottages[old2[0]].change_score(removed = old2[1:], added = self.option_stay(option1))
+        delta2 = self.cottages[old1[0]].change_score(removed = old1[1:], added = self.option_stay(option2))
+        if delta1 == None or delta2 == None: return False, 0
+        return True, delta1 + delta2
+    
+    def option_stay(self, option):
+        """
+        Function that turns an option of reservation_option into (start_day, end_day, upgrade).
+        """
+        reservation, start_day, days = option
+        return start_day, start_day + days - 1, reservation[1]
         
     def results(self):
         """
@@ -909,6 +2181,46 @@ class Planner():
         msg += "{} fri to thu gaps for a score of {}\n".format(self.fritothus, self.fritothus * -3)
         msg += "{} upgardes for a score of {}".format(self.upgrades, self.upgrades * 1)
         print(msg)
+    
+    def occupancy(self, assignments = None):
+        """
+        Function that puts an assignment in an Occupancy matrix, which scores all cottages at once.
+
+        Parameters
+        ----------
+        assignments : pd.Series, optional
+            Series with reservation_ID as index and cottage number as value. The default is the current assignment.
+
+        Returns
+        -------
+        occupancy : Occupancy
+            Occupancy of the assignment, without the pairs that are not allowed.
+
+        """
+        if assignments is None: assignments = self.reservation_assignments()
+        return Occupancy.from_assignments(self, assignments)[0]
+    
+    def validate(self, assignments = None):
+        """
+        Function that checks if every reservation is assigned once to an allowed cottage without overlap.
+
+        Parameters
+        ----------
+        assignments : pd.Series, optional
+            Series with reservation_ID as index and cottage number as value. The default is the current assignment.
+
+        Returns
+        -------
+        BOOL
+            True if the assignment is a valid solution.
+
+        """
+        if assignments is None: assignments = self.reservation_assignments()
+        occupancy, rejected = Occupancy.from_assignments(self, assignments)
+        for index, row in rejected.iterrows(): print("reservation {} with cottage {} is not allowed".format(row["ID_res"], row["ID_cot"]))
+        for ID_res in occupancy.unassigned(): print("reservation {} is not assigned".format(ID_res))
+        for row, day in occupancy.overlaps: print("cottage {} is booked more than once on day {}".format(occupancy.cottage_IDs[row], day))
+        return rejected.empty and len(occupancy.unassigned()) == 0 and len(occupancy.overlaps) == 0
         
         
 
@@ -941,4 +2253,45 @@ class Planner():
     def fritothus(self):
         total = 0
         for cottage in self.cottages.values(): total += cottage.fritothus
-        return total
\ No newline at end of file
+        return total
+
+
+def optimise_gaps_group(planner, settings):
+    """
+    Function that runs gaps_optimiser on a group planner in a worker process and returns the assignments
+    of the reservations it was allowed to move.
+    """
+    planner.gaps_optimiser(**settings)
+    assignments = planner.reservation_assignments()
+    return assignments[assignments.index.isin(planner.df_reservations["ID"])]
+
+
+def prepare_reservations(cottages, reservations):
+    """
+    Function that adds the arrival day (0 is the earliest arrival) and the final day to the reservations,
+    cuts off the stays after the last arrival day and rounds "# Persons" up to the nearest "Max # Pers" of the cottages.
+
+    Parameters
+    ----------
+    cottages : pd.DataFrame
+        DataFrame with the cottages.
+    reservations : pd.DataFrame
+        DataFrame with the reservations, is changed in place.
+
+    Returns
+    -------
+    reservations : pd.DataFrame
+        The changed reservations.
+
+    """
+    earliest_day = reservations["Arrival Date"].min()
+    reservations["day"] = reservations["Arrival Date"].apply(lambda x: (x-earliest_day).days)
+    reservations["final_day"] = reservations["day"].add(reservations["Length of Stay"]).add(-1)
+    reservations["final_day"] = reservations['final_day'].clip(upper = reservations["day"].max())
+    reservations["Length of Stay"] = reservations["final_day"].subtract(reservations["day"]).add(1)
+     # Changes "# persons" for reservations to nearest higher or equal "max # pers"
+    cottage_Max_pers = cottages["Max # Pers"].unique().tolist()
+    cottage_Max_pers.append(0)
+    cottage_Max_pers.sort()
+    for i in range(len(cottage_Max_pers) - 1): reservations.loc[(cottage_Max_pers[i] < reservations["# Persons"]).multiply(reservations["# Persons"] < cottage_Max_pers[i + 1]), "# Persons"] = cottage_Max_pers[i + 1]
+    return reservations
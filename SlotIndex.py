@@ -0,0 +1,184 @@
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+class SlotIndex():
+    """
+    Class that keeps the stays of every cottage in a sorted list, so a stay is added or removed with a binary search in its own cottage
+    and a question about one cottage and one day is answered with a binary search (bisect) in O(log n).
+    For the batched queries the stays of all cottages are also kept in one sorted array, ordered by cottage and then by arrival day,
+    so thousands of candidates are checked with one binary search (np.searchsorted). This array is updated in place on every
+    add and remove by shifting the stays behind the new or removed stay, so it is never sorted or made again.
+    The stays of a cottage never overlap, so the stay with the last arrival on or before a day is the only one that can cover it.
+    """
+    def __init__(self, daycount):
+        self.daycount = daycount
+        self.stride = daycount + 1
+         # per cottage the sorted arrival days and the last days of its stays
+        self.starts = dict()
+        self.stay_ends = dict()
+         # key of a stay is cottage_ID * stride + arrival day, the first size places of the buffers are in use
+        self.key_buffer = np.zeros(64, dtype = np.int64)
+        self.end_buffer = np.zeros(64, dtype = np.int64)
+        self.size = 0
+
+
+    def add(self, cottage_ID, start_day, end_day):
+        """
+        Function that adds a stay to the index.
+        """
+        starts = self.starts.setdefault(cottage_ID, list())
+        i = bisect_left(starts, start_day)
+        starts.insert(i, start_day)
+        self.stay_ends.setdefault(cottage_ID, list()).insert(i, end_day)
+        if self.size == len(self.key_buffer):
+            self.key_buffer = np.concatenate([self.key_buffer, np.zeros(self.size, dtype = np.int64)])
+            self.end_buffer = np.concatenate([self.end_buffer, np.zeros(self.size, dtype = np.int64)])
+        key = cottage_ID * self.stride + start_day
+        position = int(np.searchsorted(self.key_buffer[:self.size], key))
+        self.key_buffer[position + 1:self.size + 1] = self.key_buffer[position:self.size]
+        self.end_buffer[position + 1:self.size + 1] = self.end_buffer[position:self.size]
+        self.key_buffer[position] = key
+        self.end_buffer[position] = end_day
+        self.size += 1
+
+    def remove(self, cottage_ID, start_day):
+        """
+        Function that removes the stay that starts on start_day from the index.
+        """
+        starts = self.starts.get(cottage_ID, list())
+        i = bisect_left(starts, start_day)
+        if i == len(starts) or starts[i] != start_day:
+            print("!!! stay of cottage {} on day {} not in the index".format(cottage_ID, start_day))
+            return
+        del starts[i]
+        del self.stay_ends[cottage_ID][i]
+        position = int(np.searchsorted(self.key_buffer[:self.size], cottage_ID * self.stride + start_day))
+        self.key_buffer[position:self.size - 1] = self.key_buffer[position + 1:self.size]
+        self.end_buffer[position:self.size - 1] = self.end_buffer[position + 1:self.size]
+        self.size -= 1
+
+    @property
+    def keys(self): return self.key_buffer[:self.size]
+
+    @property
+    def ends(self): return self.end_buffer[:self.size]
+
+    def previous_stay(self, cottage_IDs, days):
+        """
+        Function that finds the stay with the last arrival on or before a day in the same cottage.
+
+        Parameters
+        ----------
+        cottage_IDs : INT or np.array
+            ID of the cottage(s).
+        days : INT or np.array
+            Day(s) to look from.
+
+        Returns
+        -------
+        (found : BOOL or np.array, ends : INT or np.array)
+            Whether there is such a stay and the last day of it (only meaningful where found is True).
+
+        """
+        if np.ndim(cottage_IDs) == 0 and np.ndim(days) == 0:
+            i = bisect_right(self.starts.get(cottage_IDs, list()), days) - 1
+            if i < 0: return False, 0
+            return True, self.stay_ends[cottage_IDs][i]
+        cottage_IDs = np.asarray(cottage_IDs, dtype = np.int64)
+        days = np.asarray(days, dtype = np.int64)
+        shape = np.broadcast(cottage_IDs, days).shape
+        keys = self.keys
+        if len(keys) == 0: return np.zeros(shape, dtype = bool), np.zeros(shape, dtype = np.int64)
+        positions = np.searchsorted(keys, cottage_IDs * self.stride + np.clip(days, -1, self.daycount - 1), side = "right") - 1
+        safe = np.maximum(positions, 0)
+        found = (positions >= 0) & (keys[safe] >= cottage_IDs * self.stride)
+        return found, self.ends[safe]
+
+    def ranges_free(self, cottage_IDs, start_days, end_days):
+        """
+        Function that tests if all days from start_day up to and including end_day are empty and lie within the days of the cottage.
+        """
+        found, ends = self.previous_stay(cottage_IDs, end_days)
+        if np.ndim(found) == 0 and np.ndim(start_days) == 0:
+            return start_days >= 0 and end_days <= self.daycount - 1 and not (found and ends >= start_days)
+        start_days = np.asarray(start_days, dtype = np.int64)
+        end_days = np.asarray(end_days, dtype = np.int64)
+        return (start_days >= 0) & (end_days <= self.daycount - 1) & ~(found & (ends >= start_days))
+
+    def days_free(self, cottage_IDs, days):
+        """
+        Function that tests if days are empty, days outside the cottage are not empty (like Cottage.empty_day).
+        """
+        return self.ranges_free(cottage_IDs, days, days)
+
+    def next_occupied(self, cottage_IDs, days):
+        """
+        Function that returns the first occupied day on or after a day, or daycount if the rest of the cottage is empty.
+        """
+        if np.ndim(cottage_IDs) == 0 and np.ndim(days) == 0:
+            starts = self.starts.get(cottage_IDs, list())
+            i = bisect_right(starts, days)
+            if i > 0 and self.stay_ends[cottage_IDs][i - 1] >= days: return days
+            if i < len(starts): return starts[i]
+            return self.daycount
+        cottage_IDs = np.asarray(cottage_IDs, dtype = np.int64)
+        days = np.asarray(days, dtype = np.int64)
+        keys = self.keys
+        if len(keys) == 0: return np.full(np.broadcast(cottage_IDs, days).shape, self.daycount, dtype = np.int64)
+        found, ends = self.previous_stay(cottage_IDs, days)
+        positions = np.searchsorted(keys, cottage_IDs * self.stride + days, side = "right")
+        safe = np.minimum(positions, len(keys) - 1)
+        following = (positions < len(keys)) & (keys[safe] < (cottage_IDs + 1) * self.stride)
+        next_days = np.where(following, keys[safe] - cottage_IDs * self.stride, self.daycount)
+        return np.where(found & (ends >= days), days, next_days)
+
+    def gaps_around(self, cottage_IDs, days):
+        """
+        Function that returns the first and last day of the empty stretch around empty days,
+        where a day is occupied the gap is empty (gap_end < gap_start).
+        """
+        found, ends = self.previous_stay(cottage_IDs, days - 1)
+        if np.ndim(found) == 0 and np.ndim(days) == 0:
+            gap_end = self.next_occupied(cottage_IDs, days) - 1
+            if gap_end < days: return days, days - 1
+            return max(ends + 1 if found else 0, 0), gap_end
+        days = np.asarray(days, dtype = np.int64)
+        gap_starts = np.where(found, ends + 1, 0)
+        gap_ends = self.next_occupied(cottage_IDs, days) - 1
+        occupied = gap_ends < days
+        return np.where(occupied, days, np.maximum(gap_starts, 0)), np.where(occupied, days - 1, gap_ends)
+
+    def empty_runs(self, cottage_IDs):
+        """
+        Function that finds all gaps of the cottages from the stays, the gap before every stay, after the last stay of a cottage
+        and the whole cottage if it has no stays.
+
+        Parameters
+        ----------
+        cottage_IDs : list or np.array
+            IDs of all cottages.
+
+        Returns
+        -------
+        cottage_IDs, gap_starts, gap_ends : np.array
+            Cottage ID, first day and last day of every gap.
+
+        """
+        cottage_IDs = np.asarray(cottage_IDs, dtype = np.int64)
+        keys = self.keys
+        ends = self.ends
+        stay_cottages = keys // self.stride
+        starts = keys % self.stride
+        first = np.ones(len(keys), dtype = bool)
+        first[1:] = stay_cottages[1:] != stay_cottages[:-1]
+        last = np.ones(len(keys), dtype = bool)
+        last[:-1] = first[1:]
+        previous_ends = np.full(len(keys), -1, dtype = np.int64)
+        previous_ends[1:] = ends[:-1]
+        previous_ends[first] = -1
+        empty = cottage_IDs[~np.isin(cottage_IDs, stay_cottages)]
+        gap_cottages = np.concatenate([stay_cottages, stay_cottages[last], empty])
+        gap_starts = np.concatenate([previous_ends + 1, ends[last] + 1, np.zeros(len(empty), dtype = np.int64)])
+        gap_ends = np.concatenate([starts - 1, np.full(last.sum(), self.daycount - 1), np.full(len(empty), self.daycount - 1)])
+        gaps = gap_ends >= gap_starts
+        return gap_cottages[gaps], gap_starts[gaps], gap_ends[gaps]
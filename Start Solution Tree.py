@@ -1,5 +1,6 @@
 import pandas as pd
 from Planner import Planner
+from Loader import load_dataset
 
 
  # setting variables
@@ -16,16 +17,14 @@ restrictionlist = ["Class", "Face South", "Near Playground", \
                    "Child Friendly", "Dish Washer ", \
                    "Wi-Fi Coverage ", "Covered Terrace"]
     
- # code to import from excel file
-cottages = pd.read_excel(database, sheet_name = cottage_sheet)
-reservations = pd.read_excel(database, sheet_name = reservations_sheet)
-
-assignments = pd.read_excel(database, sheet_name = read_sheet, index_col = 0, usecols = [0, 1]).squeeze()
+ # code to import from excel file, later runs read the cache of the workbook
+cottages, reservations, assignments = load_dataset(database, cottage_sheet, reservations_sheet, read_sheet)
 
  # code to run planner
 planner = Planner(cottages, reservations)
 # planner.assign_cottages()
 planner.read_assignements(assignments)
+# planner.adaptive_optimiser(max_time = 1200)
 # planner.gaps_legionella_optimiser_repeat(max_time = 600, gaps_1 = True, gaps_2 = True, gaps_3 = True, gaps_456 = True)
 # # planner.gaps_optimiser(max_time = 120)
 # # planner.legionella_optimiser(max_time = 120)
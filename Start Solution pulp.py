@@ -2,6 +2,7 @@
 import pulp
 import pandas as pd
 from time import time
+from Loader import load_dataset
 
  # setting variables
 start_time = time()
@@ -18,9 +19,9 @@ restrictionlist = ["Class", "Face South", "Near Playground", \
 def print_time(start_time, msg = ""):
     print(msg + "   --- %s seconds ---" % (time() - start_time))
     
- # code to import from excel file
-cottages = pd.read_excel(database, sheet_name = cottage_sheet)
-reservations = pd.read_excel(database, sheet_name = reservations_sheet)
+ # code to import from excel file, later runs read the cache of the workbook
+ # the reservations are used as in the workbook, this model does its own preprocessing
+cottages, reservations, assignments = load_dataset(database, cottage_sheet, reservations_sheet, prepare = False)
 
  # modify dataset
 earliest_day = reservations["Arrival Date"].min()
@@ -28,12 +29,17 @@ reservations["day"] = reservations["Arrival Date"].apply(lambda x: (x-earliest_d
 # print(reservations.columns)
 
  # create dataframe of allowed cottages and reservations
-def reservation_options(cottages, reservations):
-    combined = pd.merge(reservations, cottages, how = "cross", suffixes = ("_res", "_cot"))
-    combined = combined[combined["Max # Pers"] >= combined["# Persons"]]
-    for restriction in restrictionlist:
-        combined = combined[combined["{}_res".format(restriction)] <= combined["{}_cot".format(restriction)]]
-    combined = combined[(combined["Cottage (Fixed)"] == 0).add(combined["Cottage (Fixed)"] == combined["ID_cot"])]
+def reservation_options(cottages, reservations, block_size = 1000):
+    blocks = list()
+    for first in range(0, len(reservations), block_size):
+        block = pd.merge(reservations.iloc[first:first + block_size], cottages, how = "cross", suffixes = ("_res", "_cot"))
+        block.index += first * len(cottages)
+        allowed = block["Max # Pers"] >= block["# Persons"]
+        for restriction in restrictionlist:
+            allowed = allowed.multiply(block["{}_res".format(restriction)] <= block["{}_cot".format(restriction)])
+        allowed = allowed.multiply((block["Cottage (Fixed)"] == 0).add(block["Cottage (Fixed)"] == block["ID_cot"]))
+        blocks.append(block[allowed])
+    combined = pd.concat(blocks)
     combined = combined.reset_index()
     combined["ID"] = combined.index
     return combined
@@ -0,0 +1,87 @@
+import json
+from time import perf_counter
+
+class Telemetry():
+    """
+    Class that collects counters, timers and score samples of the optimisers in memory.
+    Every number is stored under the name of the optimiser. A Planner without telemetry (telemetry = None)
+    skips all measuring, so there is no cost when it is not used.
+    """
+    def __init__(self):
+        self.start_time = perf_counter()
+        self.counters = dict()
+        self.timers = dict()
+        self.samples = list()
+
+
+    def count(self, optimiser, name, amount = 1):
+        """
+        Function that adds amount to a counter of an optimiser.
+        """
+        counters = self.counters.setdefault(optimiser, dict())
+        counters[name] = counters.get(name, 0) + amount
+
+    def lap(self, optimiser, name, since):
+        """
+        Function that adds the time since since to a timer of an optimiser and returns the current time.
+        """
+        now = perf_counter()
+        timers = self.timers.setdefault(optimiser, dict())
+        timers[name] = timers.get(name, 0) + now - since
+        return now
+
+    def sample(self, optimiser, score):
+        """
+        Function that stores the score of the planning at this moment.
+        """
+        self.samples.append((optimiser, perf_counter() - self.start_time, score))
+
+    def summary(self):
+        """
+        Function that returns the counters and timers of every optimiser.
+
+        Returns
+        -------
+        summary : dict
+            dictionary with the optimiser as key and a dictionary with its counters and timers as value.
+
+        """
+        summary = dict()
+        for optimiser in set(self.counters) | set(self.timers):
+            summary[optimiser] = {"counters": dict(self.counters.get(optimiser, dict())), \
+                                  "timers": dict(self.timers.get(optimiser, dict()))}
+        return summary
+
+    def close(self):
+        """
+        Function that ends the telemetry, nothing is needed when it stays in memory.
+        """
+        pass
+
+
+class JsonLinesTelemetry(Telemetry):
+    """
+    Telemetry that also writes every score sample as a line of json to a file,
+    and the counters and timers of every optimiser when it is closed.
+    """
+    def __init__(self, filename):
+        super().__init__()
+        self.file = open(filename, "a")
+
+
+    def write(self, event):
+        """
+        Function that writes one event as a line of json.
+        """
+        self.file.write(json.dumps(event) + "\n")
+
+    def sample(self, optimiser, score):
+        super().sample(optimiser, score)
+        self.write({"type": "sample", "optimiser": optimiser, "seconds": self.samples[-1][1], "score": int(score)})
+
+    def close(self):
+        """
+        Function that writes the counters and timers and closes the file.
+        """
+        for optimiser, summary in self.summary().items(): self.write({"type": "summary", "optimiser": optimiser, **summary})
+        self.file.close()